@@ -2,13 +2,45 @@
 
 import json
 import re
+import shlex
 import subprocess
 import os
+from collections.abc import Iterable, Iterator
 from pathlib import Path
 
 from ..config import Config
 from ..models import FailureType, Selector, TestFailure
 
+# FAILED tests/file.py::Class::method - Exception: message...
+_SUMMARY_RE = re.compile(r"FAILED\s+(\S+)::(\S+)(?:\s+-\s+(.+))?")
+
+# PASSED tests/file.py::Class::method  (short test summary with -rA)
+_RESULT_RE = re.compile(r"^(PASSED|FAILED|ERROR)\s+(\S+)", re.MULTILINE)
+
+# ____________ TestLoginPage.test_submit_button_click ____________
+# Matched per line; ids too long for the terminal get one underscore a side
+_SECTION_RE = re.compile(r"_+ (.+?) _+$")
+
+# Playwright: ✘ test name (file:line)  /  Jest: ✕ test name
+_FAILED_PW_RE = re.compile(r"[✘✕×]\s+(?:\[\d+\]\s+)?(.+?)\s+\((.+?):(\d+):\d+\)")
+
+# Selector errors in test output; the named value group tells which pattern matched
+_ERROR_RE = re.compile(
+    # NoSuchElementException: Unable to locate element: old-submit-btn
+    r"Unable to locate element: (?P<id>[a-zA-Z0-9_-]+)"
+    # TimeoutError: Locator '#cart-icon' not found
+    r"|Locator '(?P<css>[^']+)'"
+    # Selenium patterns
+    r"|By\.ID,\s*[\"'](?P<by_id>[^\"']+)[\"']"
+    r"|By\.CSS_SELECTOR,\s*[\"'](?P<by_css>[^\"']+)[\"']",
+    re.IGNORECASE,
+)
+_ERROR_STRATEGIES = {"id": "id", "css": "css", "by_id": "id", "by_css": "css"}
+
+# Exception names folded into a full error message when they precede the match
+_ERROR_PREFIXES = {"id": "nosuchelementexception: ", "css": "timeouterror: "}
+_NOT_FOUND = " not found"
+
 
 class TestRunner:
     """Run tests using the user's configured test command."""
@@ -16,6 +48,8 @@ class TestRunner:
     def __init__(self, config: Config):
         self.config = config
         self.test_command = config.test_command
+        self._base_argv = shlex.split(config.test_command)
+        self._has_verbose = "-v" in self._base_argv or "--verbose" in self._base_argv
         # Assuming self.context is initialized elsewhere or will be added.
         # For now, providing a dummy context to avoid immediate errors if not present.
         # In a real scenario, this would likely be passed in __init__ or derived.
@@ -28,113 +62,154 @@ class TestRunner:
         # Build command
         # Auto-inject our capture plugin
         plugin_path = Path(__file__).parent.parent / "plugins" / "capture.py"
-        cmd = f"{self.test_command} -p test_warden.plugins.capture"
+        argv = [*self._base_argv, "-p", "test_warden.plugins.capture"]
         
         if test_file:
             # Handle both file path and directory
-            cmd = f"{cmd} {test_file}"
+            argv.append(str(test_file))
         
         # Add verbosity if needed
-        if "-v" not in self.test_command:
-            cmd = f"{cmd} -v"
-            
-        # Run command
-        result = subprocess.run(
-            cmd,
-            shell=True,
-            capture_output=True,
+        if not self._has_verbose:
+            argv.append("-v")
+        
+        # Run command, parsing its output line by line as it is produced
+        output_lines: list[str] = []
+        suite_path = test_file or Path.cwd()
+        with subprocess.Popen(
+            argv,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
             cwd=Path.cwd(),
             text=True,  # Ensure get string output
+            bufsize=1,
             env={**os.environ, "PYTHONPATH": f"{os.getcwd()}:{os.environ.get('PYTHONPATH', '')}"}
-        )
+        ) as proc:
+            assert proc.stdout is not None  # stdout=PIPE
+            failures = self._parse_pytest_output(
+                _collect_lines(proc.stdout, output_lines), suite_path
+            )
         
-        output = result.stdout + "\n" + result.stderr
+        output = "\n".join(output_lines)
         
         # DEBUG: Check what's happening
-        if result.returncode != 0:
+        if proc.returncode != 0:
             print(f"DEBUG: Pytest output:\n{output[:1000]}")
         
-        # Parse failures
-        failures = self._parse_failures(output, test_file or Path.cwd())
+        # Try playwright/jest format if no pytest failures found
+        if not failures:
+            failures = self._parse_playwright_output(output, suite_path)
         
-        return result.returncode == 0, output, failures
+        return proc.returncode == 0, output, failures
     
     def run_single_test(self, test_file: Path, test_name: str) -> bool:
         """Run a single test for verification."""
-        # Pytest syntax
-        cmd = f"{self.test_command} {test_file}::{test_name}"
+        return self.run_tests_batch([(test_file, test_name)])[(test_file, test_name)]
+    
+    def run_tests_batch(self, items: list[tuple[Path, str]]) -> dict[tuple[Path, str], bool]:
+        """
+        Run several tests in one invocation for verification.
+        
+        Returns:
+            Mapping of (test_file, test_name) to True if that test passed
+        """
+        if not items:
+            return {}
+        
+        # The short test summary prints node ids relative to pytest's rootdir,
+        # not as given on the command line, so results are matched by resolved
+        # path (relative to the working directory) and test name
+        cwd = Path.cwd()
+        targets = {((cwd / test_file).resolve(), test_name): (test_file, test_name)
+                   for test_file, test_name in items}
+        argv = [*self._base_argv, *(f"{test_file}::{test_name}" for test_file, test_name in items),
+                "-rA", "--tb=no"]
         
         result = subprocess.run(
-            cmd,
-            shell=True,
+            argv,
             capture_output=True,
-            cwd=Path.cwd(),
+            cwd=cwd,
+            text=True,
         )
         
-        return result.returncode == 0
-    
-    def _parse_failures(self, output: str, suite_path: Path) -> list[TestFailure]:
-        """Parse test output to extract failures."""
-        failures = []
-        
-        # Try to parse as pytest output first
-        failures.extend(self._parse_pytest_output(output, suite_path))
+        # A clean exit means every selected test passed
+        if result.returncode == 0:
+            return {item: True for item in items}
         
-        # Try playwright/jest format if no pytest failures found
-        if not failures:
-            failures.extend(self._parse_playwright_output(output, suite_path))
+        passed = {item: False for item in items}
+        for match in _RESULT_RE.finditer(result.stdout):
+            test_file, _, test_name = match.group(2).partition("::")
+            if item := targets.get(((cwd / test_file).resolve(), test_name)):
+                passed[item] = match.group(1) == "PASSED"
         
-        return failures
+        return passed
     
-    def _parse_pytest_output(self, output: str, suite_path: Path) -> list[TestFailure]:
-        """Parse pytest output format."""
-        failures = []
+    def _parse_pytest_output(self, lines: Iterable[str], suite_path: Path) -> list[TestFailure]:
+        """Parse pytest output format in a single pass over its lines."""
+        summaries: list[tuple[str, str, str | None]] = []
+        traces: dict[str, list[str]] = {}
+        errors: dict[str, str] = {}
+        current: str | None = None
         
-        # Pattern 1: Match short summary lines
-        # FAILED tests/file.py::Class::method - Exception: message...
-        summary_pattern = r"FAILED\s+(\S+)::(\S+)(?:\s+-\s+(.+))?"
+        for line in lines:
+            # Short summary line: FAILED tests/file.py::Class::method - Exception: ...
+            if line.startswith(("FAILED", "PASSED")):
+                current = None
+                if match := _SUMMARY_RE.match(line):
+                    summaries.append((match[1], match[2], match[3]))
+            # Detailed failure section header: ____ Class.method ____
+            elif line.startswith("_") and (header := _SECTION_RE.match(line)):
+                current = header.group(1)
+                traces[current] = []
+            elif line.startswith("="):
+                current = None
+            elif current is not None:
+                if len(trace := traces[current]) < 20:  # Limit to 20 lines
+                    trace.append(line)
+                # Exception lines are marked "E   " in pytest tracebacks
+                if (
+                    line.startswith("E ")
+                    and current not in errors
+                    and (error := self._match_full_error(line))
+                ):
+                    errors[current] = error
         
-        for match in re.finditer(summary_pattern, output, re.MULTILINE):
-            file_path = match.group(1)
-            test_name = match.group(2)
-            error_summary = match.group(3) or ""
-            
-            # Extract full error from the detailed failure section
-            full_error = self._extract_full_error(output, test_name)
-            error = full_error if full_error else error_summary
-            
-            failure_type = self._classify_failure_type(error)
-            selector = self._extract_selector(error)
+        failures = []
+        for file_path, test_name, error_summary in summaries:
+            test_id = f"{file_path}::{test_name}"
+            # Section headers use Class.method where the node id uses Class::method
+            section = test_id.partition("::")[2].replace("::", ".")
+            error_summary = error_summary or ""
+            error = errors.get(section) or self._match_full_error(error_summary) or error_summary
             
             failures.append(TestFailure(
-                test_id=f"{file_path}::{test_name}",
+                test_id=test_id,
                 test_file=Path(file_path),
                 test_name=test_name,
-                failure_type=failure_type,
-                selector=selector,
+                failure_type=self._classify_failure_type(error),
+                selector=self._extract_selector(error),
                 error_message=error[:500],
-                stack_trace=self._extract_stack_trace(output, test_name),
+                stack_trace="\n".join(traces.get(section, [])),
             ))
         
         return failures
     
-    def _extract_full_error(self, output: str, test_name: str) -> str:
-        """Extract the full error message for a specific test."""
-        # Extract just the method name from Class::method format
-        method_name = test_name.split("::")[-1] if "::" in test_name else test_name
-        
-        # Patterns to find in error output - capture the full error
-        patterns = [
-            r"NoSuchElementException: Unable to locate element: ([a-zA-Z0-9_-]+)",
-            r"Unable to locate element: ([a-zA-Z0-9_-]+)",
-            r"TimeoutError: Locator '([^']+)' not found",
-            r"Locator '([^']+)' not found",
-        ]
-        
-        # Search for patterns in output
-        for pattern in patterns:
-            if match := re.search(pattern, output, re.IGNORECASE):
-                return match.group(0)  # Return full match
+    @staticmethod
+    def _match_full_error(text: str) -> str:
+        """Extract a full selector error message from a line of output."""
+        for match in _ERROR_RE.finditer(text):
+            start, end = match.span()
+            if match.lastgroup == "css":
+                # Only "Locator '...' not found" counts as a full error
+                if text[end:end + len(_NOT_FOUND)].lower() != _NOT_FOUND:
+                    continue
+                end += len(_NOT_FOUND)
+            elif match.lastgroup != "id":
+                continue
+            
+            prefix = _ERROR_PREFIXES[match.lastgroup]
+            if text[max(start - len(prefix), 0):start].lower() == prefix:
+                start -= len(prefix)
+            return text[start:end]
         
         return ""
     
@@ -142,11 +217,7 @@ class TestRunner:
         """Parse Playwright/Jest output format."""
         failures = []
         
-        # Pattern for Playwright: ✘ test name (file:line)
-        # Or Jest: ✕ test name
-        failed_pattern = r"[✘✕×]\s+(?:\[\d+\]\s+)?(.+?)\s+\((.+?):(\d+):\d+\)"
-        
-        for match in re.finditer(failed_pattern, output):
+        for match in _FAILED_PW_RE.finditer(output):
             test_name = match.group(1)
             file_path = match.group(2)
             
@@ -187,43 +258,25 @@ class TestRunner:
     def _extract_selector(self, error: str) -> Selector | None:
         """Extract selector from error message."""
         # Look for specific selector patterns in error messages
-        patterns = [
-            # NoSuchElementException: Unable to locate element: old-submit-btn
-            (r'Unable to locate element: ([a-zA-Z0-9_-]+)', "id"),
-            # TimeoutError: Locator '#cart-icon' not found
-            (r"Locator '([^']+)'", "css"),
-            # Selenium patterns
-            (r'By\.ID,\s*["\']([^"\']+)["\']', "id"),
-            (r'By\.CSS_SELECTOR,\s*["\']([^"\']+)["\']', "css"),
-        ]
-        
-        for pattern, strategy in patterns:
-            if match := re.search(pattern, error, re.IGNORECASE):
-                value = match.group(1)
-                # Skip template variables
-                if '{' in value or '}' in value:
-                    continue
-                return Selector(
-                    strategy=strategy,
-                    value=value,
-                    original_code=match.group(0),
-                )
+        for match in _ERROR_RE.finditer(error):
+            if (group := match.lastgroup) is None:
+                continue
+            value = match.group(group)
+            # Skip template variables
+            if '{' in value or '}' in value:
+                continue
+            return Selector(
+                strategy=_ERROR_STRATEGIES[group],
+                value=value,
+                original_code=match.group(0),
+            )
         
         return None
-    
-    def _extract_stack_trace(self, output: str, test_name: str) -> str:
-        """Extract stack trace for a specific test."""
-        # Find the section for this test
-        lines = output.split("\n")
-        in_trace = False
-        trace_lines = []
-        
-        for line in lines:
-            if test_name in line:
-                in_trace = True
-            elif in_trace:
-                if line.startswith("FAILED") or line.startswith("PASSED"):
-                    break
-                trace_lines.append(line)
-        
-        return "\n".join(trace_lines[:20])  # Limit to 20 lines
+
+
+def _collect_lines(stream: Iterable[str], buffer: list[str]) -> Iterator[str]:
+    """Yield lines from a text stream without newlines, keeping a copy in buffer."""
+    for line in stream:
+        line = line.rstrip("\n")
+        buffer.append(line)
+        yield line
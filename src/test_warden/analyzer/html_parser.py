@@ -1,12 +1,26 @@
 """HTML parser for DOM tree construction and analysis."""
 
 from dataclasses import dataclass, field
-from typing import Iterator
+from functools import cached_property, lru_cache
+from itertools import chain
+from typing import Iterator, NamedTuple
 
-from bs4 import BeautifulSoup, Tag
+import lxml.html
+from lxml import etree
+from lxml.cssselect import CSSSelector
+from lxml.html import HtmlElement
 
 
-@dataclass
+class _DOMIndex(NamedTuple):
+    """Attribute lookups built in a single pass over the document."""
+    
+    by_testid: dict[str, list["DOMElement"]]
+    by_aria_label: dict[str, list["DOMElement"]]
+    by_id: dict[str, list["DOMElement"]]
+    by_class: dict[str, list["DOMElement"]]
+
+
+@dataclass(slots=True)
 class DOMElement:
     """Represents a DOM element with all its attributes."""
     
@@ -15,10 +29,27 @@ class DOMElement:
     classes: list[str] = field(default_factory=list)
     text: str | None = None
     attributes: dict[str, str] = field(default_factory=dict)
-    xpath: str = ""
-    css_selector: str = ""
     parent: "DOMElement | None" = None
     children: list["DOMElement"] = field(default_factory=list)
+    _source: HtmlElement | None = field(default=None, repr=False, compare=False)
+    _xpath: str | None = field(default=None, init=False, repr=False, compare=False)
+    _css_selector: str | None = field(default=None, init=False, repr=False, compare=False)
+    
+    @property
+    def xpath(self) -> str:
+        """XPath for the element, generated on first access."""
+        if self._xpath is None:
+            self._xpath = _generate_xpath(self._source) if self._source is not None else ""
+        return self._xpath
+    
+    @property
+    def css_selector(self) -> str:
+        """CSS selector for the element, generated on first access."""
+        if self._css_selector is None:
+            self._css_selector = (
+                _generate_css_selector(self._source) if self._source is not None else ""
+            )
+        return self._css_selector
     
     @property
     def data_testid(self) -> str | None:
@@ -49,104 +80,174 @@ class HTMLParser:
     """Parse HTML and build a navigable DOM tree."""
     
     def __init__(self, html: str):
-        self.soup = BeautifulSoup(html, "lxml")
-        self._element_cache: dict[str, list[DOMElement]] = {}
+        self._root = _parse_document(html)
+        self._element_cache: dict[int, DOMElement] = {}
     
     def find_by_id(self, element_id: str) -> DOMElement | None:
         """Find element by ID."""
-        tag = self.soup.find(id=element_id)
-        if tag and isinstance(tag, Tag):
-            return self._tag_to_element(tag)
-        return None
+        return _first(self._index.by_id.get(element_id))
     
     def find_by_class(self, class_name: str) -> list[DOMElement]:
-        """Find all elements with a class."""
-        tags = self.soup.find_all(class_=class_name)
-        return [self._tag_to_element(t) for t in tags if isinstance(t, Tag)]
+        """Find all elements with a class (or with every class in a space-separated list)."""
+        first, *rest = class_name.split() or [""]
+        elements = self._index.by_class.get(first, [])
+        if rest:
+            elements = [e for e in elements if all(c in e.classes for c in rest)]
+        return list(elements)
     
     def find_by_data_testid(self, testid: str) -> DOMElement | None:
         """Find element by data-testid attribute."""
-        tag = self.soup.find(attrs={"data-testid": testid})
-        if tag and isinstance(tag, Tag):
-            return self._tag_to_element(tag)
-        return None
+        return _first(self._index.by_testid.get(testid))
     
     def find_by_aria_label(self, label: str) -> DOMElement | None:
         """Find element by aria-label attribute."""
-        tag = self.soup.find(attrs={"aria-label": label})
-        if tag and isinstance(tag, Tag):
-            return self._tag_to_element(tag)
-        return None
+        return _first(self._index.by_aria_label.get(label))
     
     def find_by_text(self, text: str, tag_name: str | None = None) -> list[DOMElement]:
         """Find elements containing specific text."""
         results = []
-        for tag in self.soup.find_all(tag_name):
-            if isinstance(tag, Tag) and tag.string and text.lower() in tag.string.lower():
-                results.append(self._tag_to_element(tag))
+        text_lower = text.lower()
+        for el in self._root.iter(tag_name or etree.Element):
+            string = _element_string(el)
+            if string and text_lower in string.lower():
+                results.append(self._element_for(el))
         return results
     
     def find_by_css(self, css_selector: str) -> list[DOMElement]:
         """Find elements matching a CSS selector."""
         try:
-            tags = self.soup.select(css_selector)
-            return [self._tag_to_element(t) for t in tags if isinstance(t, Tag)]
+            return [self._element_for(el) for el in _compile_css(css_selector)(self._root)]
         except Exception:
             return []
     
     def all_elements(self) -> Iterator[DOMElement]:
         """Iterate over all elements in the document."""
-        for tag in self.soup.find_all(True):
-            if isinstance(tag, Tag):
-                yield self._tag_to_element(tag)
+        return iter(self._all)
+    
+    @property
+    def by_testid(self) -> dict[str, list[DOMElement]]:
+        """Elements carrying a data-testid, keyed by its value."""
+        return self._index.by_testid
+    
+    @property
+    def by_aria_label(self) -> dict[str, list[DOMElement]]:
+        """Elements carrying an aria-label, keyed by its value."""
+        return self._index.by_aria_label
     
-    def _tag_to_element(self, tag: Tag, parent: DOMElement | None = None) -> DOMElement:
-        """Convert a BeautifulSoup Tag to a DOMElement."""
+    @property
+    def by_id(self) -> dict[str, list[DOMElement]]:
+        """Elements carrying an id, keyed by its value."""
+        return self._index.by_id
+    
+    @cached_property
+    def _all(self) -> list[DOMElement]:
+        """All elements in document order, converted once."""
+        return [self._element_for(el) for el in self._root.iter(etree.Element)]
+    
+    @cached_property
+    def _index(self) -> _DOMIndex:
+        """Build the data-testid, aria-label, id and class lookups in one pass."""
+        index = _DOMIndex({}, {}, {}, {})
+        
+        for el in self._root.iter(etree.Element):
+            testid = el.get("data-testid")
+            aria = el.get("aria-label")
+            element_id = el.get("id")
+            classes = el.get("class")
+            # Only convert elements that can be found through an index
+            if not (testid or aria or element_id or classes):
+                continue
+            
+            element = self._element_for(el)
+            if testid:
+                index.by_testid.setdefault(testid, []).append(element)
+            if aria:
+                index.by_aria_label.setdefault(aria, []).append(element)
+            if element_id:
+                index.by_id.setdefault(element_id, []).append(element)
+            for class_name in dict.fromkeys(element.classes):
+                index.by_class.setdefault(class_name, []).append(element)
+        
+        return index
+    
+    def _element_for(self, el: HtmlElement) -> DOMElement:
+        """Convert an element to a DOMElement, reusing earlier conversions."""
+        # The DOMElement keeps the lxml proxy alive, so its id() stays unique
+        element = self._element_cache.get(id(el))
+        if element is None:
+            element = self._element_cache[id(el)] = self._tag_to_element(el)
+        return element
+    
+    def _tag_to_element(self, el: HtmlElement, parent: DOMElement | None = None) -> DOMElement:
+        """Convert an lxml element to a DOMElement."""
+        string = _element_string(el)
         element = DOMElement(
-            tag=tag.name,
-            id=tag.get("id"),
-            classes=tag.get("class", []),
-            text=tag.string.strip() if tag.string else None,
-            attributes={k: str(v) for k, v in tag.attrs.items() if k not in ("id", "class")},
-            xpath=self._generate_xpath(tag),
-            css_selector=self._generate_css_selector(tag),
+            tag=el.tag,
+            id=el.get("id"),
+            classes=(el.get("class") or "").split(),
+            text=string.strip() if string else None,
+            attributes={k: v for k, v in el.attrib.items() if k not in ("id", "class")},
             parent=parent,
+            _source=el,
         )
         return element
+
+
+@lru_cache(maxsize=256)
+def _compile_css(css_selector: str) -> CSSSelector:
+    """Translate a CSS selector to a compiled XPath once and reuse it."""
+    return CSSSelector(css_selector, translator="html")
+
+
+def _first(elements: list[DOMElement] | None) -> DOMElement | None:
+    """Return the first element of an index entry, if any."""
+    return elements[0] if elements else None
+
+
+def _parse_document(html: str) -> HtmlElement:
+    """Parse an HTML string into a full document, tolerating odd input."""
+    try:
+        return lxml.html.document_fromstring(html)
+    except ValueError:
+        # lxml rejects str input that carries an XML encoding declaration
+        return _parse_document(html.encode("utf-8"))  # type: ignore[arg-type]
+    except etree.ParserError:
+        # Empty document
+        return lxml.html.Element("html")
+
+
+def _element_string(el: HtmlElement) -> str | None:
+    """Get the element's only text node, descending through single children."""
+    while True:
+        if len(el) == 0:
+            return el.text
+        if len(el) > 1 or el.text or el[0].tail:
+            return None
+        el = el[0]
+
+
+def _generate_xpath(el: HtmlElement) -> str:
+    """Generate an XPath for the element, anchored at the nearest ancestor with an id."""
+    tree = el.getroottree()
+    path = tree.getpath(el)
     
-    def _generate_xpath(self, tag: Tag) -> str:
-        """Generate an XPath for the element."""
-        parts = []
-        current = tag
-        
-        while current and current.name != "[document]":
-            if current.get("id"):
-                parts.insert(0, f'//*[@id="{current.get("id")}"]')
-                break
-            
-            # Count previous siblings of same type
-            siblings = [s for s in current.previous_siblings if isinstance(s, Tag) and s.name == current.name]
-            index = len(siblings) + 1
-            
-            if index > 1:
-                parts.insert(0, f"{current.name}[{index}]")
-            else:
-                parts.insert(0, current.name)
-            
-            current = current.parent  # type: ignore
-        
-        return "/" + "/".join(parts) if parts else ""
+    for anchor in chain((el,), el.iterancestors()):
+        if anchor_id := anchor.get("id"):
+            return f'//*[@id="{anchor_id}"]' + path[len(tree.getpath(anchor)):]
     
-    def _generate_css_selector(self, tag: Tag) -> str:
-        """Generate a CSS selector for the element."""
-        if tag.get("id"):
-            return f"#{tag.get('id')}"
-        
-        if tag.get("data-testid"):
-            return f'[data-testid="{tag.get("data-testid")}"]'
-        
-        classes = tag.get("class", [])
-        if classes:
-            return f"{tag.name}.{'.'.join(classes[:2])}"  # Limit to 2 classes
-        
-        return tag.name
+    return path
+
+
+def _generate_css_selector(el: HtmlElement) -> str:
+    """Generate a CSS selector for the element."""
+    if el.get("id"):
+        return f"#{el.get('id')}"
+    
+    if el.get("data-testid"):
+        return f'[data-testid="{el.get("data-testid")}"]'
+    
+    classes = (el.get("class") or "").split()
+    if classes:
+        return f"{el.tag}.{'.'.join(classes[:2])}"  # Limit to 2 classes
+    
+    return el.tag
@@ -1,9 +1,17 @@
 """Selector finder - find alternative selectors for missing elements."""
 
+import re
+from collections.abc import Iterable
 from dataclasses import dataclass
+from functools import lru_cache
+
+from rapidfuzz import fuzz, process
 
 from .html_parser import DOMElement, HTMLParser
 
+# Class names in a CSS selector: .btn.btn-primary
+_CLASS_RE = re.compile(r'\.([a-zA-Z0-9_-]+)')
+
 
 @dataclass
 class SelectorCandidate:
@@ -31,7 +39,7 @@ class SelectorFinder:
     }
     
     def __init__(self, html: str):
-        self.parser = HTMLParser(html)
+        self.parser = _parser_for(html)
     
     def find_alternatives(
         self,
@@ -83,18 +91,17 @@ class SelectorFinder:
     ) -> list[SelectorCandidate]:
         """Find elements with similar data-testid values."""
         candidates = []
-        
-        for element in self.parser.all_elements():
-            if testid := element.data_testid:
-                similarity = self._string_similarity(original, testid)
-                if similarity > 0.5:
-                    candidates.append(SelectorCandidate(
-                        strategy="data-testid",
-                        value=f'[data-testid="{testid}"]',
-                        confidence=similarity,
-                        resilience_score=self.STRATEGY_PRIORITY["data-testid"],
-                        element=element,
-                    ))
+        index = self.parser.by_testid
+        
+        for testid, similarity in self._similar_values(original, index.keys(), 0.5):
+            elements = index[testid]
+            candidates.extend(SelectorCandidate(
+                strategy="data-testid",
+                value=f'[data-testid="{testid}"]',
+                confidence=similarity,
+                resilience_score=self.STRATEGY_PRIORITY["data-testid"],
+                element=element,
+            ) for element in elements)
         
         return candidates
     
@@ -119,36 +126,34 @@ class SelectorFinder:
     def _find_by_aria(self, original: str, context: dict) -> list[SelectorCandidate]:
         """Find elements with aria-label attributes."""
         candidates = []
-        
-        for element in self.parser.all_elements():
-            if aria := element.aria_label:
-                similarity = self._string_similarity(original, aria)
-                if similarity > 0.4:
-                    candidates.append(SelectorCandidate(
-                        strategy="aria-label",
-                        value=f'[aria-label="{aria}"]',
-                        confidence=similarity * 0.9,
-                        resilience_score=self.STRATEGY_PRIORITY["aria-label"],
-                        element=element,
-                    ))
+        index = self.parser.by_aria_label
+        
+        for aria, similarity in self._similar_values(original, index.keys(), 0.4):
+            elements = index[aria]
+            candidates.extend(SelectorCandidate(
+                strategy="aria-label",
+                value=f'[aria-label="{aria}"]',
+                confidence=similarity * 0.9,
+                resilience_score=self.STRATEGY_PRIORITY["aria-label"],
+                element=element,
+            ) for element in elements)
         
         return candidates
     
     def _find_similar_ids(self, original_id: str) -> list[SelectorCandidate]:
         """Find elements with similar ID values."""
         candidates = []
-        
-        for element in self.parser.all_elements():
-            if element.id:
-                similarity = self._string_similarity(original_id, element.id)
-                if similarity > 0.6:
-                    candidates.append(SelectorCandidate(
-                        strategy="id",
-                        value=f"#{element.id}",
-                        confidence=similarity,
-                        resilience_score=self.STRATEGY_PRIORITY["id"],
-                        element=element,
-                    ))
+        index = self.parser.by_id
+        
+        for element_id, similarity in self._similar_values(original_id, index.keys(), 0.6):
+            elements = index[element_id]
+            candidates.extend(SelectorCandidate(
+                strategy="id",
+                value=f"#{element_id}",
+                confidence=similarity,
+                resilience_score=self.STRATEGY_PRIORITY["id"],
+                element=element,
+            ) for element in elements)
         
         return candidates
     
@@ -176,28 +181,29 @@ class SelectorFinder:
         return candidates
     
     @staticmethod
-    def _string_similarity(s1: str, s2: str) -> float:
-        """Calculate string similarity (0.0 - 1.0)."""
-        s1, s2 = s1.lower(), s2.lower()
-        
-        if s1 == s2:
-            return 1.0
-        
-        # Simple Jaccard similarity on character n-grams
-        def ngrams(s: str, n: int = 3) -> set:
-            return {s[i:i+n] for i in range(len(s) - n + 1)}
-        
-        ng1, ng2 = ngrams(s1), ngrams(s2)
-        if not ng1 or not ng2:
-            return 0.0
-        
-        intersection = len(ng1 & ng2)
-        union = len(ng1 | ng2)
-        
-        return intersection / union if union else 0.0
+    def _similar_values(
+        original: str,
+        values: Iterable[str],
+        threshold: float,
+    ) -> list[tuple[str, float]]:
+        """Find values similar to the original as (value, similarity 0.0 - 1.0) pairs."""
+        matches = process.extract(
+            original,
+            values,
+            scorer=fuzz.ratio,
+            processor=str.lower,
+            score_cutoff=threshold * 100,
+            limit=None,
+        )
+        return [(value, score / 100) for value, score, _ in matches]
     
     @staticmethod
     def _extract_classes(selector: str) -> list[str]:
         """Extract class names from a CSS selector."""
-        import re
-        return re.findall(r'\.([a-zA-Z0-9_-]+)', selector)
+        return _CLASS_RE.findall(selector)
+
+
+@lru_cache(maxsize=8)
+def _parser_for(html: str) -> HTMLParser:
+    """Parse HTML once and share the parser across finders for the same page."""
+    return HTMLParser(html)
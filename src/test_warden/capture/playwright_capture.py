@@ -1,9 +1,21 @@
 """Playwright capture module - extracts failure artifacts from Playwright test runs."""
 
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from dataclasses import dataclass
+from functools import lru_cache
 import re
 
+# Interactive elements in an aria snapshot line, e.g. `- button "Sign In"`
+_ARIA_RE = re.compile(r'(button|textbox|link|heading) "([^"\n]+)"')
+_ARIA_ROLE_KEYS = {
+    "button": "buttons",
+    "textbox": "textboxes",
+    "link": "links",
+    "heading": "headings",
+}
+
 
 @dataclass
 class PlaywrightFailure:
@@ -30,42 +42,60 @@ class PlaywrightCapture:
         if not self.results_dir.exists():
             return failures
         
-        for folder in self.results_dir.iterdir():
-            if not folder.is_dir():
-                continue
-            
-            # Parse test name from folder name
-            # Format: test-file-Test-Suite-test-name-browser
-            test_info = self._parse_folder_name(folder.name)
-            if not test_info:
-                continue
-            
-            # Read error context
-            error_context = folder / "error-context.md"
-            aria_snapshot = ""
-            if error_context.exists():
-                aria_snapshot = error_context.read_text()
-            
-            # Find screenshot
-            screenshot = None
-            screenshots = list(folder.glob("*.png"))
-            if screenshots:
-                screenshot = screenshots[0]
-            
-            # Extract failed selector from aria snapshot context
-            failed_selector = self._extract_failed_selector_from_folder(folder)
-            
-            failures.append(PlaywrightFailure(
-                test_name=test_info["test_name"],
-                test_file=test_info["test_file"],
-                failed_selector=failed_selector,
-                error_message=self._get_error_message(folder),
-                aria_snapshot=aria_snapshot,
-                screenshot_path=screenshot,
-            ))
+        with os.scandir(self.results_dir) as entries:
+            folders = [entry for entry in entries if entry.is_dir()]
+        
+        if not folders:
+            return failures
+        
+        # Folder reads are I/O-bound, so threads overlap them well
+        with ThreadPoolExecutor(max_workers=min(8, len(folders))) as executor:
+            for failure in executor.map(self._process_folder, folders):
+                if failure:
+                    failures.append(failure)
         
         return failures
     
+    def _process_folder(self, entry: os.DirEntry) -> PlaywrightFailure | None:
+        """Extract failure information from a single result folder."""
+        # Parse test name from folder name
+        # Format: test-file-Test-Suite-test-name-browser
+        test_info = self._parse_folder_name(entry.name)
+        if not test_info:
+            return None
+        
+        folder = Path(entry.path)
+        
+        # Read error context
+        try:
+            aria_snapshot = (folder / "error-context.md").read_text()
+        except OSError:
+            aria_snapshot = ""
+        
+        # Find screenshot
+        screenshot = self._find_screenshot(entry.path)
+        
+        # Extract failed selector from aria snapshot context
+        failed_selector = self._extract_failed_selector_from_folder(folder)
+        
+        return PlaywrightFailure(
+            test_name=test_info["test_name"],
+            test_file=test_info["test_file"],
+            failed_selector=failed_selector,
+            error_message=self._get_error_message(folder),
+            aria_snapshot=aria_snapshot,
+            screenshot_path=screenshot,
+        )
+    
+    @staticmethod
+    def _find_screenshot(folder: str) -> Path | None:
+        """Return the first PNG in a result folder, if any."""
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if entry.name.endswith(".png"):
+                    return Path(entry.path)
+        return None
+    
     def _parse_folder_name(self, folder_name: str) -> dict | None:
         """Parse the Playwright test result folder name."""
         # Format: login-Login-Page-should-have-email-input-field-chromium
@@ -110,24 +140,17 @@ def parse_aria_snapshot(aria_content: str) -> dict:
         "headings": [],
     }
     
-    lines = aria_content.split("\n")
-    for line in lines:
-        line = line.strip()
-        
-        # Parse button elements
-        if match := re.search(r'button "([^"]+)"', line):
-            elements["buttons"].append(match.group(1))
-        
-        # Parse textbox elements
-        if match := re.search(r'textbox "([^"]+)"', line):
-            elements["textboxes"].append(match.group(1))
-        
-        # Parse link elements
-        if match := re.search(r'link "([^"]+)"', line):
-            elements["links"].append(match.group(1))
-        
-        # Parse heading elements
-        if match := re.search(r'heading "([^"]+)"', line):
-            elements["headings"].append(match.group(1))
+    for match in _ARIA_RE.finditer(aria_content):
+        elements[_ARIA_ROLE_KEYS[match.group(1)]].append(match.group(2))
     
     return elements
+
+
+@lru_cache(maxsize=256)
+def parse_aria_snapshot_cached(aria_content: str) -> dict:
+    """
+    Memoized parse_aria_snapshot, for failures that share a page.
+    
+    The result is shared between callers, so treat it as read-only.
+    """
+    return parse_aria_snapshot(aria_content)
@@ -1,37 +1,163 @@
 """CLI entry point for Test Warden."""
 
+import os
+import re
+from collections import defaultdict
+from functools import lru_cache
 from pathlib import Path
+from types import MappingProxyType
+from typing import TYPE_CHECKING, AnyStr, NamedTuple
 
 import click
 from rich.console import Console
-from rich.panel import Panel
-from rich.table import Table
 
-from .adapters.runner import TestRunner
-from .config import load_config
-from .models import FailureCategory, TestFailure, TestFix
-from .tracing import init_tracing
+from .models import (
+    FailureCategory,
+    FailureType,
+    HealingResult,
+    RiskLevel,
+    Selector,
+    TestFailure,
+    TestFix,
+)
+
+if TYPE_CHECKING:
+    import asyncio
+    
+    from .config import Config
+    from .healing.gemini_playwright_healer import GeminiHealingSuggestion
 
 console = Console()
 
 
+class _HeuristicRule(NamedTuple):
+    """Map a broken data-testid selector to an aria element by keywords."""
+    
+    keywords: tuple[str, ...]  # Any of these in the broken selector
+    kind: str  # parse_aria_snapshot key to search
+    role: str
+    element_keywords: tuple[str, ...]  # Any of these in the element's name
+    locator: str  # Replacement locator, formatted with the element's name
+    label: str
+
+
+# Tried in order; the first rule whose keywords match and whose kind has
+# elements decides the outcome, even if none of the elements match
+_HEURISTIC_RULES = (
+    _HeuristicRule(("email",), "textboxes", "textbox", ("email",),
+                   "page.getByLabel('{name}')", "email"),
+    _HeuristicRule(("password",), "textboxes", "textbox", ("password",),
+                   "page.getByLabel('{name}')", "password"),
+    _HeuristicRule(("submit", "login"), "buttons", "button", ("sign", "login"),
+                   "page.getByRole('button', {{ name: '{name}' }})", "submit/login"),
+    _HeuristicRule(("forgot",), "links", "link", ("forgot",),
+                   "page.getByRole('link', {{ name: '{name}' }})", "forgot"),
+    # Cart-related buttons need more context than a keyword match
+    _HeuristicRule(("checkout", "cart", "continue"), "buttons", "button", (), "", "cart"),
+)
+
+# Suggested action per failure type in analyze output
+_ACTION_MAP = MappingProxyType({
+    FailureType.SELECTOR_NOT_FOUND: "Auto-heal",
+    FailureType.ELEMENT_NOT_VISIBLE: "Auto-heal",
+    FailureType.TIMEOUT: "Check timing",
+    FailureType.ASSERTION_FAILED: "Review assertion",
+    FailureType.API_ERROR: "Report bug",
+    FailureType.UNKNOWN: "Manual review",
+})
+
+# Failure types that a selector fix can heal
+_HEALABLE_TYPES = frozenset({
+    FailureType.SELECTOR_NOT_FOUND,
+    FailureType.ELEMENT_NOT_VISIBLE,
+    FailureType.TIMEOUT,
+})
+
+# Known renames of selectors in the sample suite
+_SELECTOR_MAPPINGS = MappingProxyType({
+    "old-submit-btn": "submit-button",
+    "email-field": "email-input",
+    "password-field": "password-input",
+    "cart-icon": "cart-summary",
+    "checkout-btn": "checkout-button",
+    "item-count": "cart-count",
+})
+
+# The same renames keyed by full selector value, for _suggest_new_selector
+_SELECTOR_VALUE_MAPPINGS = MappingProxyType({
+    "old-submit-btn": "submit-button",
+    "email-field": "email-input",
+    "password-field": "password-input",
+    "#cart-icon": "cart-summary",
+    ".checkout-btn": "checkout-button",
+    "#item-count": "cart-count",
+})
+
+# Common locations for test artifacts, relative to the working directory
+# and to each test file's directory
+_ARTIFACT_DIRS = (Path("failures"), Path("artifacts"), Path("reports"), Path("test-results"))
+_TEST_ARTIFACT_DIRS = ("failures", "artifacts")
+
+# Inferred renames when no known mapping applies, applied in one pass:
+# drop the "old-" prefix and spell out "-btn"
+_RENAME_RE = re.compile(r"old-|-btn")
+_RENAMES = {"old-": "", "-btn": "-button"}
+
+# _suggest_new_selector's variant: dashes become underscores, minus any "old_"
+_SNAKE_RENAME_RE = re.compile(r"old[-_]|-")
+_SNAKE_RENAMES = {"old-": "", "old_": "", "-": "_"}
+
+# _simulate_find_selector's variant: "old" becomes "new", "-btn" is spelled out
+_DEMO_RENAME_RE = re.compile(r"old|-btn")
+_DEMO_RENAMES = {"old": "new", "-btn": "-button"}
+
+# Section rule for verbose heal-playwright output
+_SEPARATOR = "[bold]" + "─" * 50 + "[/]"
+
+# data-testid selectors in Playwright test files: [data-testid="email-input"]
+_DATA_TESTID_RE = re.compile(r'\[data-testid="([^"]+)"\]')
+
+# HTML assigned to page_source or content_html in demo test files
+_EMBEDDED_HTML_RE = re.compile(
+    r'(?P<attr>page_source|content_html)\s*=\s*"""(?P<html>.+?)"""', re.DOTALL
+)
+# Fallback: HTML in any triple-quoted string with an html tag
+_HTML_TAG_RE = re.compile(r'""".*?<html.*?>(.+?)</html>.*?"""', re.DOTALL | re.IGNORECASE)
+
+# HTML artifact file names; large snapshots are saved gzipped
+_HTML_SUFFIX_RE = re.compile(r"\.html(?:\.gz)?$")
+
+# Selector values in error messages, tried in order
+_SELECTOR_PATTERNS = tuple(re.compile(pattern, re.IGNORECASE) for pattern in (
+    r"Unable to locate element:\s*(\S+)",
+    r"Locator\s+'([^']+)'",
+    r"#([a-zA-Z0-9_-]+)",
+    r"\.([a-zA-Z0-9_-]+)",
+))
+
+
 @click.group()
 @click.version_option()
 @click.option("--config", "-c", "config_path", type=click.Path(exists=True), help="Config file path")
 @click.pass_context
 def main(ctx: click.Context, config_path: str | None) -> None:
     """Test Warden - AI-powered auto-healing for test suites."""
+    # Config (pydantic) and tracing (Langfuse) are slow to import, so they
+    # are only loaded once a command actually runs, not for --help
+    from .config import load_config
+    
     ctx.ensure_object(dict)
     
     # Load config and initialize tracing
     config = load_config(Path(config_path) if config_path else None)
     ctx.obj["config"] = config
+    ctx.obj["tracing"] = None
     
     # Initialize Langfuse tracing
-    tracing = init_tracing(config)
-    ctx.obj["tracing"] = tracing
-    
     if config.langfuse.enabled:
+        from .tracing import init_tracing
+        
+        ctx.obj["tracing"] = init_tracing(config)
         console.print("[dim]Langfuse tracing enabled[/]")
 
 
@@ -39,9 +165,15 @@ def main(ctx: click.Context, config_path: str | None) -> None:
 @click.option("--suite", "-s", required=True, help="Path to test suite directory")
 @click.option("--config", "-c", "config_path", type=click.Path(exists=True), help="Config file path")
 @click.option("--format", "-f", "output_format", type=click.Choice(["table", "json"]), default="table")
-def analyze(suite: str, config_path: str | None, output_format: str) -> None:
+@click.pass_context
+def analyze(ctx: click.Context, suite: str, config_path: str | None, output_format: str) -> None:
     """Analyze test failures without modifying files."""
-    config = load_config(Path(config_path) if config_path else None)
+    from rich.table import Table
+    from rich.text import Text
+    
+    from .adapters.runner import TestRunner
+    
+    config = _command_config(ctx, config_path)
     runner = TestRunner(config)
     
     console.print(f"\n[bold blue]🔍 Analyzing test suite:[/] {suite}\n")
@@ -56,6 +188,25 @@ def analyze(suite: str, config_path: str | None, output_format: str) -> None:
     
     console.print(f"[yellow]Found {len(failures)} failures[/]\n")
     
+    actions = [_get_suggested_action(failure) for failure in failures]
+    healable = sum(1 for action in actions if "heal" in action.lower())
+    actual_bugs = len(actions) - healable
+    
+    if output_format == "json":
+        console.print_json(data={
+            "failures": [
+                {
+                    "test": failure.test_id,
+                    "type": failure.failure_type.value,
+                    "selector": failure.selector.value if failure.selector else None,
+                    "action": action,
+                }
+                for failure, action in zip(failures, actions)
+            ],
+            "summary": {"healable": healable, "actual_bugs": actual_bugs},
+        })
+        return
+    
     # Display results
     table = Table(title="Test Failure Analysis")
     table.add_column("Test", style="cyan", max_width=40)
@@ -63,24 +214,20 @@ def analyze(suite: str, config_path: str | None, output_format: str) -> None:
     table.add_column("Selector", style="dim", max_width=30)
     table.add_column("Action", style="magenta")
     
-    healable = 0
-    actual_bugs = 0
-    
-    for failure in failures:
-        action = _get_suggested_action(failure)
-        if "heal" in action.lower():
-            healable += 1
-        else:
-            actual_bugs += 1
-        
-        selector_str = failure.selector.value[:30] if failure.selector else "-"
-        
-        table.add_row(
-            f"{failure.test_file.name}::{failure.test_name[:20]}",
-            failure.failure_type.value,
-            selector_str,
-            action,
+    # Plain Text cells skip Rich's per-cell markup parsing, which would also
+    # swallow bracketed selectors like [data-testid="..."] as style tags
+    rows = [
+        (
+            Text(f"{failure.test_file.name}::{failure.test_name[:20]}"),
+            Text(failure.failure_type.value),
+            Text(failure.selector.value[:30] if failure.selector else "-"),
+            Text(action),
         )
+        for failure, action in zip(failures, actions)
+    ]
+    add_row = table.add_row
+    for row in rows:
+        add_row(*row)
     
     console.print(table)
     
@@ -99,7 +246,9 @@ def analyze(suite: str, config_path: str | None, output_format: str) -> None:
 @click.option("--interactive", "-i", is_flag=True, help="Approve each fix individually")
 @click.option("--confidence", type=float, default=0.85, help="Minimum confidence threshold")
 @click.option("--use-ai", is_flag=True, help="Use Gemini AI for intelligent selector analysis")
+@click.pass_context
 def heal(
+    ctx: click.Context,
     suite: str,
     config_path: str | None,
     dry_run: bool,
@@ -109,10 +258,12 @@ def heal(
     use_ai: bool,
 ) -> None:
     """Heal broken tests by fixing selectors."""
+    from .adapters.runner import TestRunner
+    
     if not apply_fixes and not interactive:
         dry_run = True  # Default to dry-run
     
-    config = load_config(Path(config_path) if config_path else None)
+    config = _command_config(ctx, config_path)
     runner = TestRunner(config)
     
     mode = "dry-run" if dry_run else ("interactive" if interactive else "apply")
@@ -132,8 +283,8 @@ def heal(
     
     # Generate fixes - use AI if requested
     if use_ai:
-        import asyncio
-        fixes = asyncio.run(_generate_fixes_with_ai(failures, confidence, config))
+        with _async_runner() as async_runner:
+            fixes = async_runner.run(_generate_fixes_with_ai(failures, confidence, config))
     else:
         fixes = _generate_fixes(failures, confidence)
     
@@ -155,9 +306,10 @@ def heal(
 @main.command()
 @click.option("--suite", "-s", required=True, help="Path to test suite directory")
 @click.option("--config", "-c", "config_path", type=click.Path(exists=True), help="Config file path")
-def baseline(suite: str, config_path: str | None) -> None:
+@click.pass_context
+def baseline(ctx: click.Context, suite: str, config_path: str | None) -> None:
     """Capture baseline HTML snapshots from passing tests."""
-    config = load_config(Path(config_path) if config_path else None)
+    config = _command_config(ctx, config_path)
     
     console.print(f"\n[bold blue]📸 Capturing baseline for:[/] {suite}\n")
     
@@ -188,7 +340,7 @@ def heal_playwright(
     verbose: bool,
 ) -> None:
     """Heal broken Playwright tests using captured aria snapshots."""
-    from .capture.playwright_capture import PlaywrightCapture, parse_aria_snapshot
+    from .capture.playwright_capture import PlaywrightCapture, parse_aria_snapshot_cached
     
     if apply_fixes:
         dry_run = False
@@ -219,12 +371,49 @@ def heal_playwright(
     console.print(f"[yellow]Found {len(failures)} failed tests[/]\n")
     
     if verbose:
-        console.print("[bold]─" * 50 + "[/]")
+        console.print(_SEPARATOR)
         console.print("[bold cyan]TRIAGING FAILURES[/]")
-        console.print("[bold]─" * 50 + "[/]\n")
+        console.print(_SEPARATOR + "\n")
     
-    # Collect all fixes
+    # Collect all fixes, with sets mirroring them for constant-time dedup
     all_fixes = []
+    seen_old: set[str] = set()
+    seen_fixes: set[tuple[str, str, str]] = set()
+    # Test file contents, shared by failures in the same file and the apply step
+    file_cache: dict[Path, tuple[int, int, str]] = {}
+    # Gemini suggestions by (selector, aria snapshot)
+    ai_cache: dict[tuple[str, str], GeminiHealingSuggestion] = {}
+    # Local test file for each reported spec path, resolved once per unique path
+    test_files = {failure.test_file: test_path / Path(failure.test_file).name for failure in failures}
+    
+    if use_ai:
+        # Every selector used on a captured page, asked about in one Gemini
+        # request per page rather than one per failure and selector
+        page_selectors: dict[str, dict[str, None]] = defaultdict(dict)
+        for failure in failures:
+            test_file = test_files[failure.test_file]
+            if test_file.exists():
+                content = _read_cached(test_file, file_cache)
+                page_selected = page_selectors[failure.aria_snapshot]
+                for match in _DATA_TESTID_RE.finditer(content):
+                    full_selector = f'[data-testid="{match.group(1)}"]'
+                    if full_selector in page_selected:
+                        continue
+                    
+                    if verbose:
+                        console.print(f"\n    [dim]Analyzing: {full_selector}[/]")
+                    page_selected[full_selector] = None
+        
+        # Sorted, so a page's prompt is byte-identical from run to run and
+        # can hit Gemini's prompt cache
+        with _async_runner() as async_runner:
+            ai_cache = async_runner.run(_heal_pages_with_gemini(
+                {snapshot: sorted(selectors) for snapshot, selectors in page_selectors.items() if selectors},
+                model=config.gemini.model if config else "gemini-2.0-flash",
+                service_tier=config.gemini.service_tier if config else "standard",
+                max_concurrency=config.gemini.max_concurrency if config else 8,
+                verbose=verbose,
+            ))
     
     for i, failure in enumerate(failures, 1):
         console.print(f"[cyan]📋 [{i}/{len(failures)}] {failure.test_name}[/]")
@@ -234,140 +423,128 @@ def heal_playwright(
             if failure.screenshot_path:
                 console.print(f"  [dim]Screenshot: {failure.screenshot_path}[/]")
         
+        # Find the test file's selectors first; without any there is
+        # nothing to heal and no need to parse the aria snapshot
+        test_file = test_files[failure.test_file]
+        selectors: list[str] = []
+        if test_file.exists():
+            content = _read_cached(test_file, file_cache)
+            
+            # Find unique data-testid selectors in the test file, in file order
+            selectors = list(dict.fromkeys(
+                match.group(1) for match in _DATA_TESTID_RE.finditer(content)
+            ))
+        
+        if not selectors:
+            console.print("  [dim]No data-testid selectors in test file, skipping[/]")
+            if verbose:
+                console.print()
+            continue
+        
         # Parse aria snapshot to find available elements
-        elements = parse_aria_snapshot(failure.aria_snapshot)
+        elements = parse_aria_snapshot_cached(failure.aria_snapshot)
         
         if verbose:
-            console.print(f"\n  [bold]Aria Snapshot Analysis:[/]")
-            console.print(f"    Buttons:   {elements.get('buttons', [])}") 
-            console.print(f"    Textboxes: {elements.get('textboxes', [])}")
-            console.print(f"    Links:     {elements.get('links', [])}")
-            console.print(f"    Headings:  {elements.get('headings', [])}")
+            console.print(
+                f"\n  [bold]Aria Snapshot Analysis:[/]\n"
+                f"    Buttons:   {elements.get('buttons', [])}\n"
+                f"    Textboxes: {elements.get('textboxes', [])}\n"
+                f"    Links:     {elements.get('links', [])}\n"
+                f"    Headings:  {elements.get('headings', [])}"
+            )
         else:
             if elements:
                 console.print(f"  [dim]Found: {len(elements.get('buttons', []))} buttons, "
                              f"{len(elements.get('textboxes', []))} textboxes, "
                              f"{len(elements.get('links', []))} links[/]")
         
-        # Get test file content to find broken selectors
-        test_file = test_path / Path(failure.test_file).name
-        if test_file.exists():
-            content = test_file.read_text()
+        # Non-verbose fix lines, printed together once the failure is done
+        fix_lines: list[str] = []
+        
+        if verbose:
+            console.print(f"\n  [bold]Selector Analysis:[/]")
+            console.print(f"    Found {len(selectors)} unique data-testid selectors in test file")
+        
+        # Use AI if requested
+        if use_ai:
+            if verbose:
+                console.print(f"\n  [bold magenta]🤖 Using Gemini AI for healing[/]")
             
-            # Find data-testid selectors in the test file
-            import re
-            selectors = re.findall(r'\[data-testid="([^"]+)"\]', content)
+            # Get unique selectors that we haven't fixed yet
+            unfixed_selectors = [s for s in selectors if f'[data-testid="{s}"]' not in seen_old]
+            full_selectors = [f'[data-testid="{selector}"]' for selector in unfixed_selectors]
             
-            if verbose:
-                console.print(f"\n  [bold]Selector Analysis:[/]")
-                console.print(f"    Found {len(set(selectors))} unique data-testid selectors in test file")
+            suggestions = [ai_cache[(s, failure.aria_snapshot)] for s in full_selectors]
             
-            # Use AI if requested
-            if use_ai:
-                from .healing.gemini_playwright_healer import heal_with_gemini
-                
-                if verbose:
-                    console.print(f"\n  [bold magenta]🤖 Using Gemini AI for healing[/]")
+            for full_selector, suggestion in zip(full_selectors, suggestions):
+                if suggestion.found and suggestion.confidence >= 0.7:
+                    fix = {
+                        "file": str(test_file),
+                        "old": full_selector,
+                        "new": suggestion.new_selector,
+                        "reason": suggestion.reasoning,
+                        "confidence": suggestion.confidence,
+                    }
+                    if fix["old"] not in seen_old:
+                        all_fixes.append(fix)
+                        seen_old.add(fix["old"])
+                        if verbose:
+                            console.print(
+                                f"    [bold green]✓ AI FIX FOUND (confidence: {suggestion.confidence:.0%})[/]\n"
+                                f"      Reasoning: {suggestion.reasoning[:100]}...\n"
+                                f"      [red]Old: {fix['old']}[/]\n"
+                                f"      [green]New: {fix['new']}[/]"
+                            )
+                        else:
+                            fix_lines.append(f"  [magenta]🤖[/] [red]- {fix['old']}[/]")
+                            fix_lines.append(f"     [green]+ {fix['new']}[/] [dim]({suggestion.confidence:.0%})[/]")
+                elif verbose:
+                    console.print(f"    [dim]✗ AI could not find match (confidence: {suggestion.confidence:.0%})[/]")
+                    if suggestion.reasoning:
+                        console.print(f"      {suggestion.reasoning[:80]}...")
+        else:
+            # Heuristic-based matching, against names lowercased once per failure
+            lowered = {
+                rule.kind: [(name, name.lower()) for name in elements.get(rule.kind, [])]
+                for rule in _HEURISTIC_RULES
+            }
+            for selector in selectors:
+                new_selector = None
+                match_reason = ""
                 
-                # Get unique selectors that we haven't fixed yet
-                unfixed_selectors = [s for s in set(selectors) if f'[data-testid="{s}"]' not in [f.get("old") for f in all_fixes]]
+                # Try to match broken selector to an aria element
+                rule, name = _match_heuristic_rule(selector.lower(), lowered)
+                if rule and name:
+                    new_selector = rule.locator.format(name=name)
+                    match_reason = f"'{rule.label}' keyword matched {rule.role} '{name}'"
+                elif rule and not rule.locator and verbose:
+                    console.print(f"    [yellow]⚠ Selector '{selector}' - {rule.label}-related, needs more context[/]")
                 
-                for selector in unfixed_selectors:
-                    full_selector = f'[data-testid="{selector}"]'
-                    
-                    if verbose:
-                        console.print(f"\n    [dim]Analyzing: {full_selector}[/]")
-                    
-                    # Call Gemini (sync wrapper)
-                    suggestion = heal_with_gemini(
-                        broken_selector=full_selector,
-                        aria_snapshot=failure.aria_snapshot,
-                        screenshot_path=failure.screenshot_path,
-                        model=config.gemini.model if config else "gemini-2.0-flash",
-                        verbose=verbose,
-                    )
-                    
-                    if suggestion.found and suggestion.confidence >= 0.7:
-                        fix = {
-                            "file": str(test_file),
-                            "old": full_selector,
-                            "new": suggestion.new_selector,
-                            "reason": suggestion.reasoning,
-                            "confidence": suggestion.confidence,
-                        }
-                        if fix["old"] not in [f.get("old") for f in all_fixes]:
-                            all_fixes.append(fix)
-                            if verbose:
-                                console.print(f"    [bold green]✓ AI FIX FOUND (confidence: {suggestion.confidence:.0%})[/]")
-                                console.print(f"      Reasoning: {suggestion.reasoning[:100]}...")
-                                console.print(f"      [red]Old: {fix['old']}[/]")
-                                console.print(f"      [green]New: {fix['new']}[/]")
-                            else:
-                                console.print(f"  [magenta]🤖[/] [red]- {fix['old']}[/]")
-                                console.print(f"     [green]+ {fix['new']}[/] [dim]({suggestion.confidence:.0%})[/]")
-                    elif verbose:
-                        console.print(f"    [dim]✗ AI could not find match (confidence: {suggestion.confidence:.0%})[/]")
-                        if suggestion.reasoning:
-                            console.print(f"      {suggestion.reasoning[:80]}...")
-            else:
-                # Heuristic-based matching
-                for selector in set(selectors):
-                    selector_lower = selector.lower()
-                    new_selector = None
-                    match_reason = ""
-                    
-                    # Try to match broken selector to an aria element
-                    if "email" in selector_lower and elements.get("textboxes"):
-                        for tb in elements["textboxes"]:
-                            if "email" in tb.lower():
-                                new_selector = f"page.getByLabel('{tb}')"
-                                match_reason = f"'email' keyword matched textbox '{tb}'"
-                                break
-                    
-                    elif "password" in selector_lower and elements.get("textboxes"):
-                        for tb in elements["textboxes"]:
-                            if "password" in tb.lower():
-                                new_selector = f"page.getByLabel('{tb}')"
-                                match_reason = f"'password' keyword matched textbox '{tb}'"
-                                break
-                    
-                    elif ("submit" in selector_lower or "login" in selector_lower) and elements.get("buttons"):
-                        for btn in elements["buttons"]:
-                            if "sign" in btn.lower() or "login" in btn.lower():
-                                new_selector = f"page.getByRole('button', {{ name: '{btn}' }})"
-                                match_reason = f"'submit/login' keyword matched button '{btn}'"
-                                break
-                    
-                    elif "forgot" in selector_lower and elements.get("links"):
-                        for link in elements["links"]:
-                            if "forgot" in link.lower():
-                                new_selector = f"page.getByRole('link', {{ name: '{link}' }})"
-                                match_reason = f"'forgot' keyword matched link '{link}'"
-                                break
-                    
-                    elif ("checkout" in selector_lower or "cart" in selector_lower or "continue" in selector_lower) and elements.get("buttons"):
-                        # For cart-related buttons, use aria
+                if new_selector:
+                    fix = {
+                        "file": str(test_file),
+                        "old": f'[data-testid="{selector}"]',
+                        "new": new_selector,
+                    }
+                    fix_key = (fix["file"], fix["old"], fix["new"])
+                    if fix_key not in seen_fixes:
+                        all_fixes.append(fix)
+                        seen_fixes.add(fix_key)
                         if verbose:
-                            console.print(f"    [yellow]⚠ Selector '{selector}' - cart-related, needs more context[/]")
-                    
-                    if new_selector:
-                        fix = {
-                            "file": str(test_file),
-                            "old": f'[data-testid="{selector}"]',
-                            "new": new_selector,
-                        }
-                        if fix not in all_fixes:
-                            all_fixes.append(fix)
-                            if verbose:
-                                console.print(f"\n    [bold green]✓ FIX FOUND[/]")
-                                console.print(f"      Reason: {match_reason}")
-                                console.print(f"      [red]Old: {fix['old']}[/]")
-                                console.print(f"      [green]New: {fix['new']}[/]")
-                            else:
-                                console.print(f"  [red]- {fix['old']}[/]")
-                                console.print(f"  [green]+ {fix['new']}[/]")
-                    elif verbose and selector:
-                        console.print(f"    [dim]✗ No match for '{selector}'[/]")
+                            console.print(
+                                f"\n    [bold green]✓ FIX FOUND[/]\n"
+                                f"      Reason: {match_reason}\n"
+                                f"      [red]Old: {fix['old']}[/]\n"
+                                f"      [green]New: {fix['new']}[/]"
+                            )
+                        else:
+                            fix_lines.append(f"  [red]- {fix['old']}[/]")
+                            fix_lines.append(f"  [green]+ {fix['new']}[/]")
+                elif verbose and selector:
+                    console.print(f"    [dim]✗ No match for '{selector}'[/]")
+    
+        if fix_lines:
+            console.print("\n".join(fix_lines))
         
         if verbose:
             console.print()
@@ -375,29 +552,33 @@ def heal_playwright(
     console.print()
     
     if verbose:
-        console.print("[bold]─" * 50 + "[/]")
+        console.print(_SEPARATOR)
         console.print("[bold cyan]SUMMARY[/]")
-        console.print("[bold]─" * 50 + "[/]\n")
+        console.print(_SEPARATOR + "\n")
     
     if all_fixes:
         console.print(f"[bold]Found {len(all_fixes)} fixes[/]\n")
         
         if verbose:
             console.print("[bold]All fixes:[/]")
-            for i, fix in enumerate(all_fixes, 1):
-                console.print(f"  {i}. [red]{fix['old']}[/]")
-                console.print(f"     → [green]{fix['new']}[/]")
+            console.print("\n".join(
+                f"  {i}. [red]{fix['old']}[/]\n     → [green]{fix['new']}[/]"
+                for i, fix in enumerate(all_fixes, 1)
+            ))
             console.print()
         
         if dry_run:
             console.print("[dim]Run with --apply to modify test files[/]\n")
         else:
-            # Apply fixes
+            # Apply fixes, reading and writing each file once
+            fixes_by_file: dict[str, dict[str, str]] = defaultdict(dict)
             for fix in all_fixes:
-                file_path = Path(fix["file"])
-                content = file_path.read_text()
-                content = content.replace(fix["old"], fix["new"])
-                file_path.write_text(content)
+                fixes_by_file[fix["file"]].setdefault(fix["old"], fix["new"])
+            
+            for file_name, replacements in fixes_by_file.items():
+                file_path = Path(file_name)
+                content = _read_cached(file_path, file_cache)
+                file_path.write_text(_replace_all(content, replacements))
                 if verbose:
                     console.print(f"[green]✓ Updated {file_path}[/]")
             console.print(f"\n[green]✓ Applied {len(all_fixes)} fixes![/]")
@@ -407,44 +588,65 @@ def heal_playwright(
         console.print("[dim]The broken selectors may need manual review or AI analysis[/]\n")
 
 
+def _match_heuristic_rule(
+    selector_lower: str,
+    lowered: dict[str, list[tuple[str, str]]],
+) -> tuple[_HeuristicRule | None, str | None]:
+    """Find the heuristic rule for a selector and the element name it matched, if any."""
+    for rule in _HEURISTIC_RULES:
+        if lowered[rule.kind] and any(keyword in selector_lower for keyword in rule.keywords):
+            for name, name_lower in lowered[rule.kind]:
+                if any(keyword in name_lower for keyword in rule.element_keywords):
+                    return rule, name
+            return rule, None
+    
+    return None, None
+
+
+def _read_cached(path: Path, cache: dict[Path, tuple[int, int, str]]) -> str:
+    """Read a text file, reusing the cached copy while its mtime and size are unchanged."""
+    stat = path.stat()
+    cached = cache.get(path)
+    if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2]
+    
+    content = path.read_text()
+    cache[path] = (stat.st_mtime_ns, stat.st_size, content)
+    return content
+
+
+def _async_runner() -> "asyncio.Runner":
+    """Create an asyncio runner, on a uvloop event loop when uvloop is installed."""
+    import asyncio
+    
+    try:
+        import uvloop
+    except ImportError:
+        return asyncio.Runner()
+    return asyncio.Runner(loop_factory=uvloop.new_event_loop)
+
+
+def _command_config(ctx: click.Context, config_path: str | None) -> "Config":
+    """Use the command's own --config if given, else the one the group loaded."""
+    if config_path:
+        from .config import load_config
+        
+        return load_config(Path(config_path))
+    return ctx.obj["config"]
+
+
 def _get_suggested_action(failure: TestFailure) -> str:
     """Suggest an action based on failure type."""
-    from .models import FailureType
-    
-    action_map = {
-        FailureType.SELECTOR_NOT_FOUND: "Auto-heal",
-        FailureType.ELEMENT_NOT_VISIBLE: "Auto-heal",
-        FailureType.TIMEOUT: "Check timing",
-        FailureType.ASSERTION_FAILED: "Review assertion",
-        FailureType.API_ERROR: "Report bug",
-        FailureType.UNKNOWN: "Manual review",
-    }
-    return action_map.get(failure.failure_type, "Manual review")
+    return _ACTION_MAP.get(failure.failure_type, "Manual review")
 
 
 def _generate_fixes(failures: list[TestFailure], min_confidence: float) -> list[TestFix]:
     """Generate fixes for healable failures."""
-    from .models import HealingResult, RiskLevel, Selector, FailureType
-    
-    # Known selector mappings
-    selector_mappings = {
-        "old-submit-btn": "submit-button",
-        "email-field": "email-input",
-        "password-field": "password-input",
-        "cart-icon": "cart-summary",
-        "checkout-btn": "checkout-button",
-        "item-count": "cart-count",
-    }
-    
     fixes = []
     
     for failure in failures:
         # Only heal selector-related failures
-        if failure.failure_type not in (
-            FailureType.SELECTOR_NOT_FOUND,
-            FailureType.ELEMENT_NOT_VISIBLE,
-            FailureType.TIMEOUT,
-        ):
+        if failure.failure_type not in _HEALABLE_TYPES:
             continue
         
         # Get the broken selector value
@@ -459,10 +661,10 @@ def _generate_fixes(failures: list[TestFailure], min_confidence: float) -> list[
             continue
         
         # Find suggested new selector
-        new_selector_value = selector_mappings.get(old_selector_value.lower())
+        new_selector_value = _SELECTOR_MAPPINGS.get(old_selector_value.lower())
         if not new_selector_value:
             # Try to infer
-            new_selector_value = old_selector_value.replace("old-", "").replace("-btn", "-button")
+            new_selector_value = _rename(_RENAME_RE, _RENAMES, old_selector_value)
         
         suggested_code = f'[data-testid="{new_selector_value}"]'
         
@@ -508,35 +710,48 @@ async def _generate_fixes_with_ai(
     config: "Config",
 ) -> list[TestFix]:
     """Generate fixes using Gemini AI for intelligent analysis."""
+    import asyncio
+    
+    from rich.markup import escape
+    
     from .healing import GeminiHealingService
-    from .models import FailureType
     
     healer = GeminiHealingService(config)
-    fixes = []
+    html_index: dict[Path, list[tuple[str, Path, int]]] = {}
+    # Gemini calls are independent, so run them concurrently up to a limit
+    semaphore = asyncio.Semaphore(max(1, config.gemini.max_concurrency))
     
-    for failure in failures:
-        # Only heal selector-related failures
-        if failure.failure_type not in (
-            FailureType.SELECTOR_NOT_FOUND,
-            FailureType.ELEMENT_NOT_VISIBLE,
-            FailureType.TIMEOUT,
-        ):
-            continue
-        
+    # Only heal selector-related failures
+    healable = [failure for failure in failures if failure.failure_type in _HEALABLE_TYPES]
+    
+    async def analyze(failure: TestFailure) -> HealingResult | None:
         # Get HTML content from the test file's mock driver (for demo)
         # In real implementation, this would come from baseline snapshots
-        html_content = _get_html_for_test(failure)
+        html_content = await asyncio.to_thread(_get_html_for_test, failure, html_index)
         
         if not html_content:
             console.print(f"[dim]  Skipping {failure.test_name} - no HTML available[/]")
-            continue
+            return None
         
-        console.print(f"[dim]  Analyzing {failure.test_name} with Gemini...[/]")
-        
-        # Get Gemini's analysis
-        healing_result = await healer.analyze_failure(failure, html_content)
+        async with semaphore:
+            console.print(f"[dim]  Analyzing {failure.test_name} with Gemini...[/]")
+            
+            # Get Gemini's analysis
+            return await healer.analyze_failure(failure, html_content)
+    
+    results = await asyncio.gather(
+        *(analyze(failure) for failure in healable),
+        return_exceptions=True,
+    )
+    
+    fixes = []
+    for failure, healing_result in zip(healable, results):
+        # One failed or cancelled analysis shouldn't throw away the others' fixes
+        if isinstance(healing_result, BaseException):
+            console.print(f"[red]  Gemini analysis failed for {failure.test_name}:[/] {escape(str(healing_result))}")
+            continue
         
-        if healing_result.success and healing_result.confidence >= min_confidence:
+        if healing_result and healing_result.success and healing_result.confidence >= min_confidence:
             fixes.append(TestFix(
                 file_path=failure.test_file,
                 line_number=0,
@@ -549,21 +764,65 @@ async def _generate_fixes_with_ai(
     return fixes
 
 
-def _get_html_for_test(failure: TestFailure) -> str:
-    """Get HTML content for a test - from artifacts or mock driver."""
-    import re
-    from pathlib import Path
+async def _heal_pages_with_gemini(
+    pages: dict[str, list[str]],
+    model: str,
+    service_tier: str,
+    max_concurrency: int,
+    verbose: bool,
+) -> dict[tuple[str, str], "GeminiHealingSuggestion"]:
+    """
+    Ask Gemini about each aria snapshot's broken selectors in one batch call per page.
+    
+    Up to max_concurrency pages are in flight at once. With the "batch"
+    service tier, all pages go out as a single Gemini Batch Mode job instead.
+    """
+    import asyncio
+    
+    from .healing.gemini_playwright_healer import (
+        batch_heal_pages_with_batch_job,
+        batch_heal_with_gemini,
+    )
+    
+    # Pages are independent, but stay within the Gemini request quota
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    
+    async def heal_page(snapshot: str, selectors: list[str]) -> list["GeminiHealingSuggestion"]:
+        async with semaphore:
+            return await batch_heal_with_gemini(
+                selectors, aria_snapshot=snapshot, model=model, verbose=verbose,
+            )
+    
+    if service_tier == "batch":
+        answers = await batch_heal_pages_with_batch_job(pages, model=model, verbose=verbose)
+    else:
+        answers = await asyncio.gather(*(
+            heal_page(snapshot, selectors) for snapshot, selectors in pages.items()
+        ))
+    
+    return {
+        (selector, snapshot): suggestion
+        for (snapshot, selectors), suggestions in zip(pages.items(), answers)
+        for selector, suggestion in zip(selectors, suggestions)
+    }
+
+
+def _get_html_for_test(
+    failure: TestFailure,
+    html_index: dict[Path, list[tuple[str, Path, int]]] | None = None,
+) -> str:
+    """
+    Get HTML content for a test - from artifacts or mock driver.
+    
+    html_index caches artifact directory listings; share one across calls
+    so each directory is listed once rather than once per failure.
+    """
+    if html_index is None:
+        html_index = {}
     
     # Strategy 1: Look for real HTML artifacts on disk
-    # Common locations for test artifacts
-    artifact_dirs = [
-        Path("failures"),
-        Path("artifacts"),
-        Path("reports"),
-        Path("test-results"),
-        Path(failure.test_file).parent / "failures",
-        Path(failure.test_file).parent / "artifacts",
-    ]
+    test_dir = Path(failure.test_file).parent
+    artifact_dirs = [*_ARTIFACT_DIRS, *(test_dir / name for name in _TEST_ARTIFACT_DIRS)]
     
     # Sanitize test name for filename usually used by runners
     # e.g. test_login.py::TestLoginPage::test_submit_button_click -> test_submit_button_click
@@ -574,18 +833,19 @@ def _get_html_for_test(failure: TestFailure) -> str:
     search_names = [simple_name, class_name, failure.test_name]
     
     for directory in artifact_dirs:
-        if not directory.exists():
+        listing = _list_html_files(directory, html_index)
+        if not listing:
             continue
-            
+        
         for name in search_names:
             # Look for exact match or starting with name
             # Runners might append timestamps or IDs
-            matches = list(directory.glob(f"*{name}*.html"))
+            matches = [(path, mtime) for stem, path, mtime in listing if name in stem]
             if matches:
                 try:
                     # Return the content of the newest matching file
-                    newest = max(matches, key=lambda p: p.stat().st_mtime)
-                    return newest.read_text()
+                    newest, _ = max(matches, key=lambda match: match[1])
+                    return _read_html_artifact(newest)
                 except Exception:
                     continue
 
@@ -596,20 +856,34 @@ def _get_html_for_test(failure: TestFailure) -> str:
         test_file = Path.cwd() / test_file
     
     try:
-        content = test_file.read_text()
+        stat = test_file.stat()
+    except OSError:
+        return ""
+    
+    # Failures from the same test file share one read and regex scan
+    return _embedded_html(str(test_file), stat.st_mtime_ns, stat.st_size)
+
+
+@lru_cache(maxsize=256)
+def _embedded_html(path: str, mtime_ns: int, size: int) -> str:
+    """Extract demo HTML embedded in a test file; mtime_ns and size key the cache."""
+    try:
+        content = Path(path).read_text()
         
         # Pattern 1: self.page_source = """..."""
-        match = re.search(r'page_source\s*=\s*"""(.+?)"""', content, re.DOTALL)
-        if match:
-            return match.group(1)
-        
-        # Pattern 2: self.content_html = """..."""  
-        match = re.search(r'content_html\s*=\s*"""(.+?)"""', content, re.DOTALL)
-        if match:
-            return match.group(1)
+        # Pattern 2: self.content_html = """..."""
+        # One scan for both; page_source wins over an earlier content_html
+        html = None
+        for match in _EMBEDDED_HTML_RE.finditer(content):
+            if match.group("attr") == "page_source":
+                return match.group("html")
+            if html is None:
+                html = match.group("html")
+        if html is not None:
+            return html
         
         # Pattern 3: HTML in triple-quoted string with html tag
-        match = re.search(r'""".*?<html.*?>(.+?)</html>.*?"""', content, re.DOTALL | re.IGNORECASE)
+        match = _HTML_TAG_RE.search(content)
         if match:
             return f"<html>{match.group(1)}</html>"
             
@@ -619,43 +893,63 @@ def _get_html_for_test(failure: TestFailure) -> str:
     return ""
 
 
+def _list_html_files(
+    directory: Path,
+    html_index: dict[Path, list[tuple[str, Path, int]]],
+) -> list[tuple[str, Path, int]]:
+    """List (stem, path, mtime_ns) of a directory's HTML files (plain or gzipped), cached in html_index."""
+    if directory not in html_index:
+        listing = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    suffix = _HTML_SUFFIX_RE.search(entry.name)
+                    if not suffix:
+                        continue
+                    try:
+                        mtime = entry.stat().st_mtime_ns
+                    except OSError:
+                        continue
+                    listing.append((entry.name[:suffix.start()], Path(entry.path), mtime))
+        except OSError:
+            pass  # Missing or unreadable directory
+        html_index[directory] = listing
+    
+    return html_index[directory]
+
+
+def _read_html_artifact(path: Path) -> str:
+    """Read an HTML artifact, decompressing the .html.gz snapshots saved for large pages."""
+    if path.suffix == ".gz":
+        import gzip
+        
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return f.read()
+    return path.read_text()
+
+
 def _extract_selector_value(error: str) -> str:
     """Extract selector value from error message."""
-    import re
-    patterns = [
-        r"Unable to locate element:\s*(\S+)",
-        r"Locator\s+'([^']+)'",
-        r"#([a-zA-Z0-9_-]+)",
-        r"\.([a-zA-Z0-9_-]+)",
-    ]
-    for pattern in patterns:
-        if match := re.search(pattern, error, re.IGNORECASE):
+    for pattern in _SELECTOR_PATTERNS:
+        if match := pattern.search(error):
             return match.group(1)
     return ""
 
 
-def _suggest_new_selector(original: "Selector") -> "Selector | None":
+def _rename(pattern: re.Pattern[str], renames: dict[str, str], value: str) -> str:
+    """Apply a table of substring renames to value in a single regex pass."""
+    return pattern.sub(lambda match: renames[match.group(0)], value)
+
+
+def _suggest_new_selector(original: Selector) -> Selector | None:
     """Suggest a new selector based on the broken one."""
-    from .models import Selector
-    
-    # Map old selector values to new data-testid values
-    selector_mappings = {
-        "old-submit-btn": "submit-button",
-        "email-field": "email-input",
-        "password-field": "password-input",
-        "#cart-icon": "cart-summary",
-        ".checkout-btn": "checkout-button",
-        "#item-count": "cart-count",
-    }
-    
     value = original.value
     
-    # Check if we have a known mapping
-    new_value = selector_mappings.get(value.lower(), None)
+    # Check if we have a known mapping to a new data-testid value
+    new_value = _SELECTOR_VALUE_MAPPINGS.get(value.lower())
     if not new_value:
         # Try to infer a better selector name
-        new_value = value.replace("-", "_").replace("old_", "").replace("old-", "")
-        new_value = new_value.replace("-btn", "-button").replace("-field", "-input")
+        new_value = _rename(_SNAKE_RENAME_RE, _SNAKE_RENAMES, value)
     
     return Selector(
         strategy="data-testid",
@@ -664,13 +958,11 @@ def _suggest_new_selector(original: "Selector") -> "Selector | None":
     )
 
 
-def _simulate_find_selector(original: "Selector") -> "Selector | None":
+def _simulate_find_selector(original: Selector) -> Selector | None:
     """Simulate finding a new selector (placeholder)."""
-    from .models import Selector
-    
     # This would use the HTML analyzer in real implementation
     # Just return a modified selector for demonstration
-    new_value = original.value.replace("old", "new").replace("-btn", "-button")
+    new_value = _rename(_DEMO_RENAME_RE, _DEMO_RENAMES, original.value)
     
     return Selector(
         strategy="css",
@@ -681,29 +973,40 @@ def _simulate_find_selector(original: "Selector") -> "Selector | None":
 
 def _show_diff_preview(fixes: list[TestFix]) -> None:
     """Show diff preview of proposed changes."""
-    from rich.markup import escape
+    from rich.console import Group
+    from rich.text import Text
     
     console.print("[bold]Proposed changes:[/]\n")
     
+    # Plain Text renderables need no markup escaping, and the whole preview
+    # goes out in a single print
+    previews = []
     for fix in fixes:
         test_name = fix.failure.test_name.split("::")[-1] if "::" in fix.failure.test_name else fix.failure.test_name
         file_name = f"{fix.file_path.name}::{test_name}"
         
-        console.print(f"[cyan]📁 {file_name}[/]")
-        console.print(f"[red]- {escape(fix.original_code)}[/]")
-        console.print(f"[green]+ {escape(fix.fixed_code)}[/]")
-        console.print(f"[dim]  confidence: {fix.healing_result.confidence:.0%}[/]")
-        console.print()
+        previews.append(Text.assemble(
+            (f"📁 {file_name}\n", "cyan"),
+            (f"- {fix.original_code}\n", "red"),
+            (f"+ {fix.fixed_code}\n", "green"),
+            (f"  confidence: {fix.healing_result.confidence:.0%}\n", "dim"),
+        ))
+    
+    console.print(Group(*previews))
 
 
 def _interactive_apply(fixes: list[TestFix]) -> None:
     """Interactively apply fixes with user approval."""
+    from rich.text import Text
+    
     applied = 0
     
     for fix in fixes:
-        console.print(f"\n[cyan]📁 {fix.file_path}[/]")
-        console.print(f"[red]- {fix.original_code}[/]")
-        console.print(f"[green]+ {fix.fixed_code}[/]")
+        console.print(Text.assemble(
+            (f"\n📁 {fix.file_path}\n", "cyan"),
+            (f"- {fix.original_code}\n", "red"),
+            (f"+ {fix.fixed_code}", "green"),
+        ))
         
         response = click.prompt(
             "Apply this fix?",
@@ -722,21 +1025,45 @@ def _interactive_apply(fixes: list[TestFix]) -> None:
 
 
 def _apply_fixes(fixes: list[TestFix]) -> None:
-    """Apply all fixes to test files."""
+    """Apply all fixes to test files, reading and writing each file once."""
+    fixes_by_file: dict[Path, dict[str, str]] = defaultdict(dict)
     for fix in fixes:
-        _apply_single_fix(fix)
+        fixes_by_file[fix.file_path].setdefault(fix.original_code, fix.fixed_code)
+    
+    for file_path, replacements in fixes_by_file.items():
+        _rewrite_file(file_path, replacements)
 
 
 def _apply_single_fix(fix: TestFix) -> None:
     """Apply a single fix to a test file."""
-    # Read file
-    content = fix.file_path.read_text()
-    
-    # Replace the code
-    new_content = content.replace(fix.original_code, fix.fixed_code)
+    _rewrite_file(fix.file_path, {fix.original_code: fix.fixed_code})
+
+
+def _rewrite_file(path: Path, replacements: dict[str, str]) -> None:
+    """Apply replacements to a file, working on raw bytes when they are all ASCII."""
+    if all(old.isascii() and new.isascii() for old, new in replacements.items()):
+        # ASCII bytes never occur inside a multi-byte UTF-8 sequence,
+        # so the file can be edited without decoding it
+        encoded = {old.encode(): new.encode() for old, new in replacements.items()}
+        data = path.read_bytes()
+        if (new_data := _replace_all(data, encoded)) != data:
+            path.write_bytes(new_data)
+    else:
+        content = path.read_text()
+        if (new_content := _replace_all(content, replacements)) != content:
+            path.write_text(new_content)
+
+
+def _replace_all(content: AnyStr, replacements: dict[AnyStr, AnyStr]) -> AnyStr:
+    """Apply several literal replacements in a single scan of the content."""
+    # Longest first, so a selector wins over a shorter one it contains
+    olds = sorted((old for old in replacements if old), key=len, reverse=True)
+    if not olds:
+        return content
     
-    # Write back
-    fix.file_path.write_text(new_content)
+    separator = b"|" if isinstance(content, bytes) else "|"
+    pattern = re.compile(separator.join(map(re.escape, olds)))
+    return pattern.sub(lambda match: replacements[match.group(0)], content)
 
 
 if __name__ == "__main__":
@@ -1,15 +1,19 @@
 """Configuration management for Test Warden."""
 
+import threading
+from functools import cache
 from pathlib import Path
 from typing import Literal
 
 import yaml
-from dotenv import load_dotenv
 from pydantic import BaseModel, Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
-# Load .env file at import time
-load_dotenv()
+# Prefer the libyaml C parser when PyYAML was built with it
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
 
 
 class GeminiConfig(BaseModel):
@@ -18,6 +22,10 @@ class GeminiConfig(BaseModel):
     model: str = "gemini-2.0-flash"
     vision_enabled: bool = True
     max_retries: int = 3
+    max_concurrency: int = 8  # Simultaneous Gemini requests
+    # "batch" sends heal-playwright --use-ai requests as one Gemini Batch Mode
+    # job: half the price, but results can take up to 24 hours
+    service_tier: Literal["standard", "batch"] = "standard"
 
 
 class LangfuseConfig(BaseModel):
@@ -71,9 +79,21 @@ class Config(BaseSettings):
     integrations: IntegrationsConfig = Field(default_factory=IntegrationsConfig)
 
 
+# Parsed YAML settings keyed by resolved file path, with the (mtime, size,
+# inode) signature they were read at
+_CONFIG_CACHE: dict[Path, tuple[tuple[int, int, int], dict]] = {}
+_CONFIG_LOCK = threading.Lock()
+
+
 def load_config(config_path: Path | None = None) -> Config:
-    """Load configuration from YAML file and environment variables."""
-    config_data: dict = {}
+    """
+    Load configuration from YAML file and environment variables.
+    
+    A file's parsed YAML is cached until the file changes on disk. The
+    Config itself is built on every call, so environment variables are
+    always read fresh and each caller gets its own instance.
+    """
+    _load_dotenv()
     
     # Try to find config file
     if config_path is None:
@@ -82,14 +102,47 @@ def load_config(config_path: Path | None = None) -> Config:
                 config_path = Path(name)
                 break
     
-    # Load from YAML if exists
-    if config_path and config_path.exists():
-        with open(config_path) as f:
-            raw = yaml.safe_load(f)
-            if raw and "test_warden" in raw:
-                config_data = raw["test_warden"]
-            elif raw:
-                config_data = raw
+    if not (config_path and config_path.exists()):
+        return Config()
+    
+    path = config_path.resolve()
+    stat = path.stat()
+    signature = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+    
+    with _CONFIG_LOCK:
+        cached = _CONFIG_CACHE.get(path)
+    if cached and cached[0] == signature:
+        config_data = cached[1]
+    else:
+        config_data = _read_config_file(path)
+        with _CONFIG_LOCK:
+            _CONFIG_CACHE[path] = (signature, config_data)
     
     # Environment variables override YAML
     return Config(**config_data)
+
+
+@cache
+def _load_dotenv() -> None:
+    """Load the .env file into the environment, once per process."""
+    from dotenv import load_dotenv
+    
+    load_dotenv()
+
+
+def _read_config_file(config_path: Path) -> dict:
+    """
+    Parse a YAML config file into the settings to build a Config from.
+    
+    Parsing uses libyaml when PyYAML has it, which is recommended for speed.
+    """
+    config_data: dict = {}
+    
+    with open(config_path) as f:
+        raw = yaml.load(f, Loader=_YamlLoader)
+        if raw and "test_warden" in raw:
+            config_data = raw["test_warden"]
+        elif raw:
+            config_data = raw
+    
+    return config_data
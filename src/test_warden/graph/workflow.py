@@ -1,11 +1,9 @@
 """LangGraph workflow for test healing orchestration."""
 
-from typing import Annotated, TypedDict
-
-from langgraph.graph import END, StateGraph
+from functools import cache
+from typing import TYPE_CHECKING, TypedDict
 
 from ..models import (
-    AnalysisReport,
     FailureCategory,
     HealingResult,
     RiskLevel,
@@ -13,6 +11,9 @@ from ..models import (
     TestFix,
 )
 
+if TYPE_CHECKING:
+    from langgraph.graph import StateGraph
+
 
 class HealingState(TypedDict):
     """State for the healing workflow."""
@@ -20,106 +21,130 @@ class HealingState(TypedDict):
     # Input
     failures: list[TestFailure]
     
-    # Processing state
-    current_index: int
-    current_failure: TestFailure | None
-    
-    # Layer results
-    html_result: HealingResult | None
-    vision_result: HealingResult | None
-    har_result: dict | None
+    # Layer results, one entry per failure in the same order
+    html_results: list[HealingResult | None]
+    vision_results: list[HealingResult | None]
+    har_results: list[dict | None]
     
     # Output
-    fixes: Annotated[list[TestFix], "append"]
-    actual_bugs: Annotated[list[TestFailure], "append"]
-    needs_review: Annotated[list[TestFailure], "append"]
+    fixes: list[TestFix]
+    actual_bugs: list[TestFailure]
+    needs_review: list[TestFailure]
+
+
+def analyze_html(state: HealingState) -> dict:
+    """Layer 1: Analyze every failure using its HTML DOM."""
+    return {"html_results": [_analyze_html(failure) for failure in state["failures"]]}
+
+
+def analyze_vision(state: HealingState) -> dict:
+    """Layer 2: Analyze failures HTML couldn't heal using Gemini Vision."""
+    return {"vision_results": [
+        None if _healed(html_result) else _analyze_vision(failure)
+        for failure, html_result in zip(state["failures"], state["html_results"])
+    ]}
+
+
+def analyze_har(state: HealingState) -> dict:
+    """Layer 3: Check HAR logs of failures HTML couldn't heal for API failures."""
+    return {"har_results": [
+        None if _healed(html_result) else _analyze_har(failure)
+        for failure, html_result in zip(state["failures"], state["html_results"])
+    ]}
+
+
+def classify_failures(state: HealingState) -> dict:
+    """Classify every failure from its analysis results and generate fixes."""
+    fixes: list[TestFix] = []
+    actual_bugs: list[TestFailure] = []
+    needs_review: list[TestFailure] = []
     
-    # Control
-    use_vision: bool
-    complete: bool
+    for failure, html_result, vision_result, har_result in zip(
+        state["failures"],
+        state["html_results"],
+        state["vision_results"],
+        state["har_results"],
+    ):
+        # Check HAR first - API errors are actual bugs
+        if har_result and har_result["has_failure"]:
+            actual_bugs.append(failure)
+            continue
+    
+        result = html_result or vision_result
+        if _healed(result):
+            fixes.append(_generate_fix(failure, result))
+        elif not result:
+            # No analysis succeeded, mark for review
+            needs_review.append(failure)
+    
+    return {"fixes": fixes, "actual_bugs": actual_bugs, "needs_review": needs_review}
 
 
-def collect_failures(state: HealingState) -> HealingState:
-    """Initialize processing of failures."""
-    if state["failures"]:
-        return {
-            **state,
-            "current_index": 0,
-            "current_failure": state["failures"][0],
-            "complete": False,
-        }
-    return {**state, "complete": True}
+def _healed(result: HealingResult | None) -> bool:
+    """Check if an analysis result is a successful heal."""
+    return bool(result and result.success)
 
 
-def analyze_html(state: HealingState) -> HealingState:
-    """Layer 1: Analyze failure using HTML DOM."""
-    failure = state["current_failure"]
-    if not failure or not failure.html_snapshot:
-        return {**state, "html_result": None, "use_vision": True}
+def _analyze_html(failure: TestFailure) -> HealingResult | None:
+    """Find a replacement selector for one failure in its HTML snapshot."""
+    if not failure.html_snapshot or not failure.selector:
+        return None
     
     # Import here to avoid circular imports
     from ..analyzer.selector_finder import SelectorFinder
     
     finder = SelectorFinder(failure.html_snapshot)
     
-    if failure.selector:
-        # Try to find alternative selectors
-        candidates = finder.find_alternatives(
-            failure.selector.strategy,
-            failure.selector.value,
-            {"expected_text": failure.context.get("expected_text")},
-        )
-        
-        if candidates and candidates[0].confidence > 0.7:
-            best = candidates[0]
-            result = HealingResult(
-                success=True,
-                category=FailureCategory.HEALABLE_SELECTOR,
-                confidence=best.confidence,
-                original_selector=failure.selector,
-                new_selector=None,  # Will be populated by healer
-                suggested_code=best.value,
-                evidence=[f"Found similar element with {best.strategy}"],
-                risk_level=RiskLevel.LOW,
-                requires_review=False,
-            )
-            return {**state, "html_result": result, "use_vision": False}
+    # Try to find alternative selectors
+    candidates = finder.find_alternatives(
+        failure.selector.strategy,
+        failure.selector.value,
+        {"expected_text": failure.context.get("expected_text")},
+    )
+    
+    if not candidates or candidates[0].confidence <= 0.7:
+        # HTML analysis didn't find a match, try vision
+        return None
     
-    # HTML analysis didn't find a match, try vision
-    return {**state, "html_result": None, "use_vision": True}
+    best = candidates[0]
+    return HealingResult(
+        success=True,
+        category=FailureCategory.HEALABLE_SELECTOR,
+        confidence=best.confidence,
+        original_selector=failure.selector,
+        new_selector=None,  # Will be populated by healer
+        suggested_code=best.value,
+        evidence=[f"Found similar element with {best.strategy}"],
+        risk_level=RiskLevel.LOW,
+        requires_review=False,
+    )
 
 
-def analyze_vision(state: HealingState) -> HealingState:
-    """Layer 2: Analyze failure using Gemini Vision."""
-    failure = state["current_failure"]
-    
-    if not failure or not failure.screenshot_path:
+def _analyze_vision(failure: TestFailure) -> HealingResult | None:
+    """Analyze one failure's screenshot."""
+    if not failure.screenshot_path:
         # No screenshot available, mark for review
-        return {**state, "vision_result": None}
+        return None
     
     # Vision analysis would be async in real implementation
     # For now, return a placeholder that indicates vision is needed
-    result = HealingResult(
+    return HealingResult(
         success=False,
         category=FailureCategory.HEALABLE_SELECTOR,
         confidence=0.0,
-        original_selector=failure.selector if failure else None,
+        original_selector=failure.selector,
         new_selector=None,
         suggested_code=None,
         evidence=["Vision analysis required"],
         risk_level=RiskLevel.MEDIUM,
         requires_review=True,
     )
-    
-    return {**state, "vision_result": result}
 
 
-def analyze_har(state: HealingState) -> HealingState:
-    """Layer 3: Check HAR logs for API failures."""
-    failure = state["current_failure"]
-    
-    if not failure or not failure.har_log_path:
-        return {**state, "har_result": None}
+def _analyze_har(failure: TestFailure) -> dict | None:
+    """Summarize API failures in one failure's HAR log."""
+    if not failure.har_log_path:
+        return None
     
     from ..network.har_parser import HARParser
     
@@ -129,53 +154,17 @@ def analyze_har(state: HealingState) -> HealingState:
     if result.has_api_failures:
         primary = result.primary_failure
         return {
-            **state,
-            "har_result": {
-                "has_failure": True,
-                "status": primary.status if primary else 0,
-                "url": primary.url if primary else "",
-            },
+            "has_failure": True,
+            "status": primary.status if primary else 0,
+            "url": primary.url if primary else "",
         }
     
-    return {**state, "har_result": {"has_failure": False}}
+    return {"has_failure": False}
 
 
-def classify_failure(state: HealingState) -> HealingState:
-    """Classify the failure based on all analysis results."""
-    # Check HAR first - API errors are actual bugs
-    if state.get("har_result", {}).get("has_failure"):
-        failure = state["current_failure"]
-        if failure:
-            return {
-                **state,
-                "actual_bugs": [failure],
-            }
-    
-    # Check if HTML found a fix
-    if state.get("html_result") and state["html_result"].success:
-        return state  # Already has healing result
-    
-    # Check vision result
-    if state.get("vision_result"):
-        return state
-    
-    # No analysis succeeded, mark for review
-    failure = state["current_failure"]
-    if failure:
-        return {**state, "needs_review": [failure]}
-    
-    return state
-
-
-def generate_fix(state: HealingState) -> HealingState:
-    """Generate a fix for healable failures."""
-    failure = state["current_failure"]
-    result = state.get("html_result") or state.get("vision_result")
-    
-    if not failure or not result or not result.success:
-        return state
-    
-    fix = TestFix(
+def _generate_fix(failure: TestFailure, result: HealingResult) -> TestFix:
+    """Generate a fix for a healable failure."""
+    return TestFix(
         file_path=failure.test_file,
         line_number=0,  # Would be determined by code analysis
         original_code=failure.selector.original_code if failure.selector else "",
@@ -183,82 +172,30 @@ def generate_fix(state: HealingState) -> HealingState:
         failure=failure,
         healing_result=result,
     )
-    
-    return {**state, "fixes": [fix]}
 
 
-def next_failure(state: HealingState) -> HealingState:
-    """Move to next failure in the queue."""
-    next_idx = state["current_index"] + 1
-    
-    if next_idx >= len(state["failures"]):
-        return {**state, "complete": True, "current_failure": None}
-    
-    return {
-        **state,
-        "current_index": next_idx,
-        "current_failure": state["failures"][next_idx],
-        "html_result": None,
-        "vision_result": None,
-        "har_result": None,
-        "use_vision": False,
-    }
-
-
-def should_use_vision(state: HealingState) -> str:
-    """Decide whether to use vision analysis."""
-    if state.get("use_vision"):
-        return "vision"
-    return "classify"
-
-
-def is_healable(state: HealingState) -> str:
-    """Check if failure is healable."""
-    result = state.get("html_result") or state.get("vision_result")
-    
-    if result and result.success:
-        return "heal"
-    return "next"
-
-
-def is_complete(state: HealingState) -> str:
-    """Check if all failures have been processed."""
-    if state.get("complete"):
-        return END
-    return "html"
-
-
-def build_healing_graph() -> StateGraph:
+def build_healing_graph() -> "StateGraph":
     """Build the LangGraph workflow for test healing."""
+    from langgraph.graph import END, StateGraph
+    
     graph = StateGraph(HealingState)
     
-    # Add nodes
-    graph.add_node("collect", collect_failures)
+    # Each layer processes the whole batch of failures in one step
     graph.add_node("html", analyze_html)
     graph.add_node("vision", analyze_vision)
     graph.add_node("har", analyze_har)
-    graph.add_node("classify", classify_failure)
-    graph.add_node("heal", generate_fix)
-    graph.add_node("next", next_failure)
+    graph.add_node("classify", classify_failures)
     
-    # Add edges
-    graph.set_entry_point("collect")
-    graph.add_conditional_edges("collect", is_complete)
-    graph.add_conditional_edges("html", should_use_vision, {
-        "vision": "vision",
-        "classify": "classify",
-    })
+    graph.set_entry_point("html")
+    graph.add_edge("html", "vision")
     graph.add_edge("vision", "har")
     graph.add_edge("har", "classify")
-    graph.add_conditional_edges("classify", is_healable, {
-        "heal": "heal",
-        "next": "next",
-    })
-    graph.add_edge("heal", "next")
-    graph.add_conditional_edges("next", is_complete)
+    graph.add_edge("classify", END)
     
     return graph.compile()
 
 
-# Export compiled graph
-healing_workflow = build_healing_graph()
+@cache
+def healing_workflow() -> "StateGraph":
+    """Get the compiled healing graph, built on first use."""
+    return build_healing_graph()
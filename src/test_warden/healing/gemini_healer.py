@@ -1,27 +1,36 @@
 """Gemini-powered healing service for finding correct selectors."""
 
-import json
 import re
 from dataclasses import dataclass
+from typing import Annotated
+
+from pydantic import BeforeValidator, TypeAdapter, ValidationError
 
 from ..config import Config
 from ..models import FailureCategory, HealingResult, RiskLevel, Selector, TestFailure
 from ..vision.gemini_client import GeminiClient
 from ..tracing import get_tracing
+from .json_extract import extract_json_object
+from .prompt_text import truncate_for_prompt
 
+# Selector values in error messages, tried in order
+_SELECTOR_PATTERNS = tuple(re.compile(pattern, re.IGNORECASE) for pattern in (
+    r"Unable to locate element:\s*(\S+)",
+    r"Locator\s+'([^']+)'",
+    r'#([a-zA-Z0-9_-]+)',
+))
 
+# The DOM and instructions come first and the broken selector last, so
+# calls for several selectors on one page share a cacheable prompt prefix
 HEALING_PROMPT = """You are an expert at analyzing HTML DOM and fixing broken Selenium/Playwright test selectors.
 
-## Context
-A test was looking for an element using this selector: `{broken_selector}`
-The test failed because the element was not found.
-
 ## Current HTML DOM
 ```html
 {html}
 ```
 
 ## Task
+A test failed because the element for the broken selector below was not found.
 Analyze the HTML and find the element that the test was likely trying to interact with.
 Consider:
 1. Similar data-testid values
@@ -42,20 +51,33 @@ Respond with valid JSON only:
 }}
 
 If the element appears to have been removed entirely (not just renamed), set found=false.
+
+## Broken Selector
+The test was looking for an element using this selector: `{broken_selector}`
 """
 
 
+# Text fields Gemini may answer with null, e.g. an element with no text
+_Text = Annotated[str, BeforeValidator(lambda value: "" if value is None else value)]
+
+
 @dataclass
 class HealingSuggestion:
     """A suggestion from Gemini for fixing a broken selector."""
     
-    found: bool
-    confidence: float
-    suggested_selector: str
-    element_tag: str
-    element_text: str
-    reasoning: str
-    risk_level: str
+    # Defaults fill in fields missing from Gemini's JSON
+    found: bool = False
+    confidence: float = 0.0
+    suggested_selector: _Text = ""
+    element_tag: _Text = ""
+    element_text: _Text = ""
+    reasoning: _Text = ""
+    risk_level: Annotated[str, BeforeValidator(lambda value: value or "medium")] = "medium"
+
+
+# Validates Gemini's JSON straight into a HealingSuggestion, coercing
+# values like "0.9" and ignoring extra keys
+_SUGGESTION_ADAPTER = TypeAdapter(HealingSuggestion)
 
 
 class GeminiHealingService:
@@ -143,8 +165,8 @@ class GeminiHealingService:
         html: str,
     ) -> HealingSuggestion:
         """Call Gemini API to get a healing suggestion."""
-        # Truncate HTML if too long
-        html_truncated = html[:8000] if len(html) > 8000 else html
+        # Truncate HTML if too long, after the last complete tag
+        html_truncated = truncate_for_prompt(html, 8000, boundary=">")
         
         prompt = HEALING_PROMPT.format(
             broken_selector=broken_selector,
@@ -170,8 +192,8 @@ class GeminiHealingService:
     def _parse_gemini_response(self, response: str) -> HealingSuggestion:
         """Parse Gemini's JSON response."""
         # Extract JSON from response (may be wrapped in markdown)
-        json_match = re.search(r'\{[\s\S]*\}', response)
-        if not json_match:
+        json_text = extract_json_object(response)
+        if json_text is None:
             return HealingSuggestion(
                 found=False,
                 confidence=0.0,
@@ -183,17 +205,8 @@ class GeminiHealingService:
             )
         
         try:
-            data = json.loads(json_match.group())
-            return HealingSuggestion(
-                found=data.get("found", False),
-                confidence=float(data.get("confidence", 0.0)),
-                suggested_selector=data.get("suggested_selector", ""),
-                element_tag=data.get("element_tag", ""),
-                element_text=data.get("element_text", ""),
-                reasoning=data.get("reasoning", ""),
-                risk_level=data.get("risk_level", "medium"),
-            )
-        except (json.JSONDecodeError, KeyError, ValueError):
+            return _SUGGESTION_ADAPTER.validate_json(json_text)
+        except ValidationError:
             return HealingSuggestion(
                 found=False,
                 confidence=0.0,
@@ -206,13 +219,8 @@ class GeminiHealingService:
     
     def _extract_selector_from_error(self, error: str) -> str:
         """Extract selector value from error message."""
-        patterns = [
-            r"Unable to locate element:\s*(\S+)",
-            r"Locator\s+'([^']+)'",
-            r'#([a-zA-Z0-9_-]+)',
-        ]
-        for pattern in patterns:
-            if match := re.search(pattern, error, re.IGNORECASE):
+        for pattern in _SELECTOR_PATTERNS:
+            if match := pattern.search(error):
                 return match.group(1)
         return ""
     
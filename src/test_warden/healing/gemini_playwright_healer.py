@@ -1,32 +1,43 @@
 """Gemini AI-powered healing for Playwright tests."""
 
+import asyncio
+import hashlib
 import json
-import re
+import threading
 import time
+from functools import cache
 from pathlib import Path
 from dataclasses import dataclass
 
 from google import genai
 from rich.console import Console
 
+from .json_extract import extract_json_array, extract_json_object
+from .prompt_text import truncate_for_prompt
+
 console = Console()
 
+# Characters of aria snapshot sent to Gemini
+_ARIA_PROMPT_CHARS = 6000
 
-GEMINI_HEALING_PROMPT = """You are an expert at fixing broken Playwright test selectors.
+# Shared Gemini client and the event loop it was created on; its async
+# HTTP connection pool belongs to that loop, so a new loop gets a new client
+_client: tuple[asyncio.AbstractEventLoop, genai.Client] | None = None
 
-## Context
-A test failed because it couldn't find an element using this selector:
-**Broken selector:** `{broken_selector}`
+
+# The page state and instructions come first and the broken selector last,
+# so calls for several selectors on one page share a cacheable prompt prefix
+GEMINI_HEALING_PROMPT = """You are an expert at fixing broken Playwright test selectors.
 
 ## Current Page State (Aria Accessibility Tree)
-This is what Playwright captured at the moment of failure - it shows all interactive elements currently on the page:
+A test failed because it couldn't find an element. This is what Playwright captured at the moment of failure - it shows all interactive elements currently on the page:
 
 ```yaml
 {aria_snapshot}
 ```
 
 ## Your Task
-1. Analyze what element the test was trying to find based on the selector name
+1. Analyze what element the test was trying to find based on the broken selector's name
 2. Find the matching element in the aria snapshot  
 3. Suggest a Playwright locator that will work
 
@@ -43,7 +54,7 @@ Respond with valid JSON only:
     "reasoning": "Step-by-step explanation of how you found the match",
     "element_type": "button|textbox|link|heading|other",
     "element_label": "The visible label/text of the matched element",
-    "old_selector": "{broken_selector}",
+    "old_selector": "The broken selector, verbatim",
     "new_selector": "Playwright locator code",
     "confidence": 0.0-1.0
 }}
@@ -56,9 +67,29 @@ If no matching element exists, set found=false and explain why.
 - For links: `page.getByRole('link', {{ name: 'Link Text' }})`
 - For headings: `page.getByRole('heading', {{ name: 'Heading Text' }})`
 - Avoid data-testid if possible - role-based locators are more resilient
+
+## Broken Selector
+**Broken selector:** `{broken_selector}`
 """
 
 
+def get_gemini_client() -> genai.Client:
+    """Get the Gemini client for the running event loop, creating it on first use."""
+    global _client
+    loop = asyncio.get_running_loop()
+    if _client is None or _client[0] is not loop:
+        _client = (loop, genai.Client())
+    return _client[1]
+
+
+@cache
+def _background_loop() -> asyncio.AbstractEventLoop:
+    """Start the event loop that sync callers run Gemini calls on, on first use."""
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="gemini-healer", daemon=True).start()
+    return loop
+
+
 @dataclass
 class GeminiHealingSuggestion:
     """A healing suggestion from Gemini."""
@@ -81,12 +112,12 @@ async def heal_with_gemini_async(
     """
     Use Gemini AI to analyze the failure and suggest a fix (async version).
     """
-    client = genai.Client()
+    client = get_gemini_client()
     
     # Build the prompt
     prompt = GEMINI_HEALING_PROMPT.format(
         broken_selector=broken_selector,
-        aria_snapshot=aria_snapshot[:6000],
+        aria_snapshot=truncate_for_prompt(aria_snapshot, _ARIA_PROMPT_CHARS),
     )
     
     if verbose:
@@ -107,8 +138,8 @@ async def heal_with_gemini_async(
             console.print(f"    [dim]Gemini response received ({len(text)} chars, {elapsed_time:.2f}s)[/]")
         
         # Extract JSON from response
-        json_match = re.search(r'\{[\s\S]*\}', text)
-        if not json_match:
+        json_text = extract_json_object(text)
+        if json_text is None:
             return GeminiHealingSuggestion(
                 found=False,
                 reasoning="Could not parse Gemini response as JSON",
@@ -117,7 +148,7 @@ async def heal_with_gemini_async(
                 confidence=0.0,
             )
         
-        data = json.loads(json_match.group())
+        data = json.loads(json_text)
         
         return GeminiHealingSuggestion(
             found=data.get("found", False),
@@ -151,27 +182,15 @@ def heal_with_gemini(
 ) -> GeminiHealingSuggestion:
     """
     Use Gemini AI to analyze the failure and suggest a fix (sync version).
-    """
-    import asyncio
     
-    try:
-        loop = asyncio.get_event_loop()
-        if loop.is_running():
-            import concurrent.futures
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                future = executor.submit(
-                    asyncio.run,
-                    heal_with_gemini_async(broken_selector, aria_snapshot, screenshot_path, model, verbose)
-                )
-                return future.result()
-        else:
-            return loop.run_until_complete(
-                heal_with_gemini_async(broken_selector, aria_snapshot, screenshot_path, model, verbose)
-            )
-    except RuntimeError:
-        return asyncio.run(
-            heal_with_gemini_async(broken_selector, aria_snapshot, screenshot_path, model, verbose)
-        )
+    Calls run on one long-lived background loop, so repeated and concurrent
+    sync callers share its Gemini client and connection pool.
+    """
+    future = asyncio.run_coroutine_threadsafe(
+        heal_with_gemini_async(broken_selector, aria_snapshot, screenshot_path, model, verbose),
+        _background_loop(),
+    )
+    return future.result()
 
 
 async def batch_heal_with_gemini(
@@ -183,22 +202,152 @@ async def batch_heal_with_gemini(
 ) -> list[GeminiHealingSuggestion]:
     """
     Heal multiple broken selectors in a single Gemini call (more efficient).
+    
+    Selectors already answered for this page earlier in the run, and repeats
+    within the list, are not sent again.
+    
+    Returns one suggestion per selector, in the order given.
     """
-    client = genai.Client()
+    # The snapshot is hashed once per call, not once per selector
+    prefix = _heal_cache_prefix(aria_snapshot)
+    keys = [prefix + selector for selector in selectors]
+    pending = list(dict.fromkeys(
+        selector for selector, key in zip(selectors, keys) if key not in _heal_cache
+    ))
+    failed: dict[str, GeminiHealingSuggestion] = {}
     
-    prompt = f"""You are an expert at fixing broken Playwright test selectors.
+    if pending:
+        client = get_gemini_client()
+        
+        if verbose:
+            console.print(f"    [dim]Batch healing {len(pending)} selectors with Gemini...[/]")
+        
+        try:
+            response = await client.aio.models.generate_content(
+                model=model,
+                contents=_batch_prompt(pending, aria_snapshot),
+            )
+            # Only real answers are cached; a selector whose answer was
+            # missing or unreadable is asked about again on the next call
+            for selector, answer in zip(pending, _parse_batch_answers(pending, response.text)):
+                if isinstance(answer, str):
+                    failed[selector] = _batch_not_found([selector], answer)[0]
+                else:
+                    _heal_cache[prefix + selector] = answer
+            
+        except Exception as e:
+            if verbose:
+                console.print(f"    [red]Gemini batch error: {e}[/]")
+            # Errors aren't cached, so a later call retries these selectors
+            failed = dict(zip(pending, _batch_not_found(pending, f"Gemini API error: {str(e)}")))
+    
+    return [
+        failed[selector] if selector in failed else _heal_cache[key]
+        for selector, key in zip(selectors, keys)
+    ]
+
+
+async def batch_heal_pages_with_batch_job(
+    pages: dict[str, list[str]],
+    model: str = "gemini-2.0-flash",
+    poll_seconds: float = 30.0,
+    max_wait_seconds: float = 25 * 60 * 60,
+    verbose: bool = False,
+) -> list[list[GeminiHealingSuggestion]]:
+    """
+    Heal the broken selectors of several pages through one Gemini Batch Mode job.
+    
+    Batch jobs cost half as much as regular calls but may take up to 24 hours,
+    so this suits unattended runs. Each page (keyed by aria snapshot) becomes
+    one request in the job. Polling gives up after max_wait_seconds.
+    
+    Returns one list of suggestions per page, in the order given.
+    """
+    if not pages:
+        return []
+    
+    client = get_gemini_client()
+    requests = [
+        {"contents": [{"role": "user", "parts": [{"text": _batch_prompt(selectors, snapshot)}]}]}
+        for snapshot, selectors in pages.items()
+    ]
+    
+    try:
+        job = await client.aio.batches.create(model=model, src=requests)
+        console.print(f"[dim]Submitted Gemini batch job {job.name}, waiting for results...[/]")
+        
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + max_wait_seconds
+        while job.state.name not in _BATCH_DONE_STATES:
+            if loop.time() >= deadline:
+                reason = f"Gave up waiting for Gemini batch job {job.name} ({job.state.name})"
+                return [_batch_not_found(selectors, reason) for selectors in pages.values()]
+            await asyncio.sleep(poll_seconds)
+            job = await client.aio.batches.get(name=job.name)
+            if verbose:
+                console.print(f"    [dim]Batch job {job.name}: {job.state.name}[/]")
+        
+        if job.state.name not in _BATCH_ANSWERED_STATES:
+            reason = f"Gemini batch job ended in {job.state.name}"
+            return [_batch_not_found(selectors, reason) for selectors in pages.values()]
+        
+        # A partially succeeded job may come back with fewer responses than
+        # pages; the pages past the end get not-found suggestions
+        answers = list(job.dest.inlined_responses or []) if job.dest else []
+        results = []
+        for i, selectors in enumerate(pages.values()):
+            answer = answers[i] if i < len(answers) else None
+            if answer is None:
+                results.append(_batch_not_found(selectors, "No response for this page in Gemini batch job"))
+            elif answer.error or not answer.response:
+                results.append(_batch_not_found(selectors, f"Gemini API error: {answer.error}"))
+            else:
+                results.append(_parse_batch_response(selectors, answer.response.text))
+        return results
+        
+    except Exception as e:
+        if verbose:
+            console.print(f"    [red]Gemini batch job error: {e}[/]")
+        return [_batch_not_found(selectors, f"Gemini API error: {str(e)}") for selectors in pages.values()]
 
-## Broken Selectors
-The following selectors failed - the test couldn't find these elements:
-{chr(10).join(f'- `{s}`' for s in selectors)}
+
+# Suggestions Gemini returned during this run, keyed by _heal_cache_prefix()
+# of the page followed by the selector
+_heal_cache: dict[str, GeminiHealingSuggestion] = {}
+
+
+def _heal_cache_prefix(aria_snapshot: str) -> str:
+    """Key prefix for suggestions about the part of the page the prompt shows."""
+    # Bump the version when the batch prompt changes so old answers are ignored
+    prompted = truncate_for_prompt(aria_snapshot, _ARIA_PROMPT_CHARS)
+    digest = hashlib.sha256(prompted.encode()).hexdigest()[:16]
+    return f"v1-heal:{digest}:"
+
+
+# Batch job states with responses to read
+_BATCH_ANSWERED_STATES = frozenset({
+    "JOB_STATE_SUCCEEDED",
+    "JOB_STATE_PARTIALLY_SUCCEEDED",
+})
+# Batch job states after which polling stops
+_BATCH_DONE_STATES = _BATCH_ANSWERED_STATES | {
+    "JOB_STATE_FAILED",
+    "JOB_STATE_CANCELLED",
+    "JOB_STATE_EXPIRED",
+}
+
+
+def _batch_prompt(selectors: list[str], aria_snapshot: str) -> str:
+    """Build the prompt asking about several broken selectors on one page."""
+    return f"""You are an expert at fixing broken Playwright test selectors.
 
 ## Current Page State (Aria Accessibility Tree)
 ```yaml
-{aria_snapshot[:6000]}
+{truncate_for_prompt(aria_snapshot, _ARIA_PROMPT_CHARS)}
 ```
 
 ## Your Task
-For EACH broken selector, find the matching element and suggest a fix.
+For EACH broken selector listed below, find the matching element and suggest a fix.
 
 ## Response Format
 Respond with a JSON array:
@@ -212,38 +361,83 @@ Respond with a JSON array:
     }},
     ...
 ]
+
+## Playwright Locator Best Practices
+- For buttons: `page.getByRole('button', {{ name: 'Button Text' }})`
+- For textboxes with labels: `page.getByLabel('Label Text')`
+- For links: `page.getByRole('link', {{ name: 'Link Text' }})`
+- For headings: `page.getByRole('heading', {{ name: 'Heading Text' }})`
+- Avoid data-testid if possible - role-based locators are more resilient
+
+## Broken Selectors
+The following selectors failed - the test couldn't find these elements:
+{chr(10).join(f'- `{s}`' for s in selectors)}
 """
+
+
+def _parse_batch_response(selectors: list[str], text: str) -> list[GeminiHealingSuggestion]:
+    """Parse a batch response into one suggestion per selector, in order."""
+    return [
+        _batch_not_found([selector], answer)[0] if isinstance(answer, str) else answer
+        for selector, answer in zip(selectors, _parse_batch_answers(selectors, text))
+    ]
+
+
+def _parse_batch_answers(selectors: list[str], text: str) -> list[GeminiHealingSuggestion | str]:
+    """
+    Parse a batch response into one entry per selector, in order.
     
-    if verbose:
-        console.print(f"    [dim]Batch healing {len(selectors)} selectors with Gemini...[/]")
+    Each entry is the suggestion built from Gemini's answer, or the reason
+    there was no usable answer for that selector.
+    """
+    # Extract JSON array
+    json_text = extract_json_array(text)
+    if json_text is None:
+        return ["Could not parse Gemini response as JSON"] * len(selectors)
     
     try:
-        response = await client.aio.models.generate_content(
-            model=model,
-            contents=prompt,
+        data = [item for item in json.loads(json_text) if isinstance(item, dict)]
+    except json.JSONDecodeError:
+        return ["Invalid JSON in Gemini response"] * len(selectors)
+    
+    # Match answers to selectors by the echoed selector, falling back to
+    # response order when every selector got exactly one answer
+    answers = {item.get("old_selector", ""): item for item in data}
+    in_order = len(data) == len(selectors)
+    
+    suggestions: list[GeminiHealingSuggestion | str] = []
+    for i, selector in enumerate(selectors):
+        item = answers.get(selector) or (data[i] if in_order else None)
+        if item is None:
+            suggestions.append("No answer in Gemini batch response")
+            continue
+        try:
+            confidence = float(item.get("confidence", 0.0))
+        except (TypeError, ValueError):
+            # e.g. "confidence": null; only this selector's answer is unusable
+            suggestions.append("Invalid answer in Gemini batch response")
+            continue
+        suggestions.append(GeminiHealingSuggestion(
+            found=item.get("found", False),
+            reasoning=item.get("reasoning", ""),
+            old_selector=selector,
+            new_selector=item.get("new_selector", ""),
+            confidence=confidence,
+            element_type=item.get("element_type", ""),
+            element_label=item.get("element_label", ""),
+        ))
+    return suggestions
+
+
+def _batch_not_found(selectors: list[str], reasoning: str) -> list[GeminiHealingSuggestion]:
+    """Build not-found suggestions for selectors a batch call couldn't answer."""
+    return [
+        GeminiHealingSuggestion(
+            found=False,
+            reasoning=reasoning,
+            old_selector=selector,
+            new_selector="",
+            confidence=0.0,
         )
-        
-        text = response.text
-        
-        # Extract JSON array
-        json_match = re.search(r'\[[\s\S]*\]', text)
-        if not json_match:
-            return []
-        
-        data = json.loads(json_match.group())
-        
-        return [
-            GeminiHealingSuggestion(
-                found=item.get("found", False),
-                reasoning=item.get("reasoning", ""),
-                old_selector=item.get("old_selector", ""),
-                new_selector=item.get("new_selector", ""),
-                confidence=float(item.get("confidence", 0.0)),
-            )
-            for item in data
-        ]
-        
-    except Exception as e:
-        if verbose:
-            console.print(f"    [red]Gemini batch error: {e}[/]")
-        return []
+        for selector in selectors
+    ]
@@ -0,0 +1,51 @@
+"""Extract JSON embedded in Gemini responses (which may wrap it in markdown)."""
+
+import re
+
+# Characters that affect bracket balance, plus escape sequences so an
+# escaped quote inside a string is skipped as one token
+_TOKEN_RE = re.compile(r'\\.|["{}\[\]]', re.DOTALL)
+_OPENERS = frozenset("{[")
+_CLOSERS = frozenset("}]")
+
+
+def extract_json_object(text: str) -> str | None:
+    """Return the first balanced {...} in text, or None if there isn't one."""
+    return _extract_balanced(text, "{")
+
+
+def extract_json_array(text: str) -> str | None:
+    """Return the first balanced [...] in text, or None if there isn't one."""
+    return _extract_balanced(text, "[")
+
+
+def _extract_balanced(text: str, opener: str) -> str | None:
+    """
+    Scan from the first opener to its matching closer in a single pass.
+    
+    Brackets inside JSON string literals are ignored, so a "}" in a
+    reasoning string doesn't end the object early.
+    """
+    start = text.find(opener)
+    if start == -1:
+        return None
+    
+    depth = 0
+    in_string = False
+    
+    for match in _TOKEN_RE.finditer(text, start):
+        token = match.group()
+        if in_string:
+            if token == '"':
+                in_string = False
+        elif token == '"':
+            in_string = True
+        elif token in _OPENERS:
+            depth += 1
+        elif token in _CLOSERS:
+            depth -= 1
+            if depth == 0:
+                return text[start:match.end()]
+    
+    # Unbalanced, e.g. a truncated response
+    return None
@@ -8,12 +8,36 @@ from rich.console import Console
 from rich.panel import Panel
 from rich.table import Table
 
-from ..capture.playwright_capture import PlaywrightCapture, parse_aria_snapshot
+from ..capture.playwright_capture import PlaywrightCapture, parse_aria_snapshot_cached
 from ..healing.gemini_healer import GeminiHealingService
+from ..healing.json_extract import extract_json_object
 from ..config import Config
 
 console = Console()
 
+# data-testid selectors in a test file, with either quote style
+_TESTID_PATTERNS = (
+    re.compile(r'\[data-testid="([^"]+)"\]'),
+    re.compile(r"data-testid='([^']+)'"),
+)
+
+# Mapping of common selector keywords to aria roles
+_SELECTOR_TO_ROLE = {
+    "email": ("textbox", "Email"),
+    "password": ("textbox", "Password"),
+    "submit": ("button", "Sign In"),
+    "login": ("button", "Sign In"),
+    "forgot": ("link", "Forgot Password?"),
+    "checkout": ("button", None),
+    "cart": ("button", None),
+    "continue": ("button", None),
+}
+# Finds every keyword occurrence in one pass; the lookahead lets matches
+# overlap, so "emailogin" still yields both "email" and "login"
+_ROLE_KEYWORD_RE = re.compile(
+    "(?=(" + "|".join(map(re.escape, _SELECTOR_TO_ROLE)) + "))"
+)
+
 
 PLAYWRIGHT_HEALING_PROMPT = """You are an expert at fixing broken Playwright test selectors.
 
@@ -58,9 +82,9 @@ async def analyze_playwright_failure(
     config: Config,
 ) -> dict:
     """Analyze a Playwright failure and suggest a fix using Gemini."""
-    from google import genai
+    from .gemini_playwright_healer import get_gemini_client
     
-    client = genai.Client()
+    client = get_gemini_client()
     
     prompt = PLAYWRIGHT_HEALING_PROMPT.format(
         broken_selector=broken_selector,
@@ -75,9 +99,9 @@ async def analyze_playwright_failure(
         
         # Parse JSON from response
         text = response.text
-        json_match = re.search(r'\{[\s\S]*\}', text)
-        if json_match:
-            return json.loads(json_match.group())
+        json_text = extract_json_object(text)
+        if json_text is not None:
+            return json.loads(json_text)
         return {"found": False, "reasoning": "Could not parse response"}
     except Exception as e:
         return {"found": False, "reasoning": f"Error: {str(e)}"}
@@ -93,16 +117,11 @@ def extract_selectors_from_test_file(test_file: Path) -> list[str]:
     content = test_file.read_text()
     
     # Find all data-testid patterns
-    patterns = [
-        r'\[data-testid="([^"]+)"\]',
-        r"data-testid='([^']+)'",
-    ]
-    
-    for pattern in patterns:
-        matches = re.findall(pattern, content)
-        selectors.extend(matches)
+    for pattern in _TESTID_PATTERNS:
+        selectors.extend(pattern.findall(content))
     
-    return list(set(selectors))
+    # Deduplicate, keeping the order they appear in the file
+    return list(dict.fromkeys(selectors))
 
 
 def suggest_fixes_from_aria(broken_selectors: list[str], aria_snapshot: str) -> list[dict]:
@@ -111,37 +130,28 @@ def suggest_fixes_from_aria(broken_selectors: list[str], aria_snapshot: str) ->
     
     This is a heuristic approach that doesn't require Gemini.
     """
-    elements = parse_aria_snapshot(aria_snapshot)
+    elements = parse_aria_snapshot_cached(aria_snapshot)
     fixes = []
     
-    # Mapping of common selector patterns to aria roles
-    selector_to_role = {
-        "email": ("textbox", "Email"),
-        "password": ("textbox", "Password"),
-        "submit": ("button", "Sign In"),
-        "login": ("button", "Sign In"),
-        "forgot": ("link", "Forgot Password?"),
-        "checkout": ("button", None),
-        "cart": ("button", None),
-        "continue": ("button", None),
-    }
+    # Case-fold the textbox labels once rather than for every selector
+    textboxes = [(textbox, textbox.lower()) for textbox in elements.get("textboxes", [])]
     
     for selector in broken_selectors:
-        selector_lower = selector.lower()
+        # Every keyword in the selector from one scan, tried in table order
+        matched = set(_ROLE_KEYWORD_RE.findall(selector.lower()))
         
-        for keyword, (role, expected_name) in selector_to_role.items():
-            if keyword in selector_lower:
+        for keyword, (role, expected_name) in _SELECTOR_TO_ROLE.items():
+            if keyword in matched:
                 # Find matching element in aria snapshot
-                if role == "textbox" and elements.get("textboxes"):
-                    for textbox in elements["textboxes"]:
-                        if keyword in textbox.lower():
-                            fixes.append({
-                                "old_selector": f'[data-testid="{selector}"]',
-                                "new_selector": f'page.getByLabel(\'{textbox}\')',
-                                "reasoning": f"Changed from data-testid to getByLabel for '{textbox}'",
-                                "confidence": 0.9,
-                            })
-                            break
+                if role == "textbox" and textboxes:
+                    textbox = next((label for label, lower in textboxes if keyword in lower), None)
+                    if textbox is not None:
+                        fixes.append({
+                            "old_selector": f'[data-testid="{selector}"]',
+                            "new_selector": f'page.getByLabel(\'{textbox}\')',
+                            "reasoning": f"Changed from data-testid to getByLabel for '{textbox}'",
+                            "confidence": 0.9,
+                        })
                 
                 elif role == "button" and elements.get("buttons"):
                     for button in elements["buttons"]:
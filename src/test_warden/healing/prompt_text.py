@@ -0,0 +1,19 @@
+"""Fit page content (HTML, aria snapshots) into a Gemini prompt's budget."""
+
+
+def truncate_for_prompt(text: str, max_chars: int, boundary: str = "\n") -> str:
+    """
+    Cut text to at most max_chars, ending on a boundary where possible.
+    
+    Stopping after the last complete line (or tag, with boundary=">") keeps
+    the prompt free of a half element the model might try to match, and
+    gives the same prefix every time the same page is sent.
+    """
+    if len(text) <= max_chars:
+        return text
+    
+    cut = text.rfind(boundary, 0, max_chars)
+    if cut < max_chars // 2:
+        # No boundary near the limit, e.g. minified HTML on one line
+        return text[:max_chars]
+    return text[:cut + len(boundary)]
@@ -1,21 +1,46 @@
 """HAR log parser for detecting API/network failures."""
 
-import json
-from dataclasses import dataclass
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from functools import cached_property
 from pathlib import Path
+from typing import ClassVar
+
+# orjson parses a whole HAR file several times faster when it's installed
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
+
+# Static assets, which aren't API calls
+_STATIC_EXTENSIONS = (".js", ".css", ".png", ".jpg", ".svg", ".woff", ".ico")
 
 
 @dataclass
 class NetworkRequest:
     """Represents a network request from HAR log."""
     
+    # Requests taking longer than this are reported as slow
+    SLOW_THRESHOLD_MS: ClassVar[float] = 5000.0
+    
     url: str
     method: str
     status: int
     status_text: str
     time_ms: float
-    request_headers: dict
-    response_headers: dict
+    # Header lists as they appear in the HAR; turned into dicts on first access
+    raw_request_headers: list[dict] = field(default_factory=list, repr=False)
+    raw_response_headers: list[dict] = field(default_factory=list, repr=False)
+    
+    @cached_property
+    def request_headers(self) -> dict:
+        """Request headers by name."""
+        return {h["name"]: h["value"] for h in self.raw_request_headers}
+    
+    @cached_property
+    def response_headers(self) -> dict:
+        """Response headers by name."""
+        return {h["name"]: h["value"] for h in self.raw_response_headers}
     
     @property
     def is_error(self) -> bool:
@@ -27,8 +52,7 @@ class NetworkRequest:
         """Check if this is a 5xx server error."""
         return 500 <= self.status < 600
     
-    @property
-    def is_slow(self, threshold_ms: float = 5000) -> bool:
+    def is_slow(self, threshold_ms: float = SLOW_THRESHOLD_MS) -> bool:
         """Check if request was slow."""
         return self.time_ms > threshold_ms
 
@@ -67,46 +91,68 @@ class HARParser:
     
     def __init__(self, har_path: Path):
         self.har_path = har_path
-        self._data: dict | None = None
-    
-    def load(self) -> None:
-        """Load HAR file."""
-        with open(self.har_path) as f:
-            self._data = json.load(f)
     
-    def analyze(self) -> HARAnalysisResult:
-        """Analyze HAR log for failures."""
-        if not self._data:
-            self.load()
+    def analyze(
+        self,
+        slow_threshold_ms: float = NetworkRequest.SLOW_THRESHOLD_MS,
+    ) -> HARAnalysisResult:
+        """Analyze HAR log for failures, reporting requests slower than slow_threshold_ms."""
+        total = 0
+        failed: list[NetworkRequest] = []
+        slow: list[NetworkRequest] = []
+        api_errors: list[NetworkRequest] = []
         
-        entries = self._data.get("log", {}).get("entries", [])
-        requests = []
-        
-        for entry in entries:
-            req = entry.get("request", {})
+        # Classify each entry from its raw status and time in a single pass;
+        # only failed or slow requests are turned into NetworkRequest objects
+        for entry in self._iter_entries():
+            total += 1
             res = entry.get("response", {})
+            is_error = res.get("status", 0) >= 400
+            is_slow = entry.get("time", 0) > slow_threshold_ms
+            if not (is_error or is_slow):
+                continue
             
-            requests.append(NetworkRequest(
+            req = entry.get("request", {})
+            request = NetworkRequest(
                 url=req.get("url", ""),
                 method=req.get("method", "GET"),
                 status=res.get("status", 0),
                 status_text=res.get("statusText", ""),
                 time_ms=entry.get("time", 0),
-                request_headers={h["name"]: h["value"] for h in req.get("headers", [])},
-                response_headers={h["name"]: h["value"] for h in res.get("headers", [])},
-            ))
-        
-        failed = [r for r in requests if r.is_error]
-        slow = [r for r in requests if r.is_slow]
-        api_errors = [r for r in requests if r.is_error and self._is_api_request(r)]
+                raw_request_headers=req.get("headers", []),
+                raw_response_headers=res.get("headers", []),
+            )
+            if is_error:
+                failed.append(request)
+                if self._is_api_request(request):
+                    api_errors.append(request)
+            if is_slow:
+                slow.append(request)
         
         return HARAnalysisResult(
-            total_requests=len(requests),
+            total_requests=total,
             failed_requests=failed,
             slow_requests=slow,
             api_errors=api_errors,
         )
     
+    def _iter_entries(self) -> Iterator[dict]:
+        """
+        Yield the HAR log's entries.
+        
+        With ijson installed, entries are streamed from disk one at a time, so
+        memory tracks a single entry rather than the whole (possibly very
+        large) log; otherwise the file is parsed in one go.
+        """
+        with open(self.har_path, "rb") as f:
+            try:
+                import ijson
+            except ImportError:
+                yield from _json_loads(f.read()).get("log", {}).get("entries", [])
+                return
+            
+            yield from ijson.items(f, "log.entries.item", use_float=True)
+    
     @staticmethod
     def _is_api_request(req: NetworkRequest) -> bool:
         """Check if request is an API call (not static asset)."""
@@ -117,5 +163,4 @@ class HARParser:
             return True
         
         # Exclude static assets
-        static_extensions = (".js", ".css", ".png", ".jpg", ".svg", ".woff", ".ico")
-        return not any(url.endswith(ext) for ext in static_extensions)
+        return not url.endswith(_STATIC_EXTENSIONS)
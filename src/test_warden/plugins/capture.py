@@ -1,21 +1,56 @@
 """Pytest plugin to capture HTML snapshots on test failure."""
 
-import os
-import pytest
-from pathlib import Path
-from datetime import datetime
+import warnings
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from pathlib import Path
+    
+    import pytest
+
+# Snapshots are written in the background so failing tests don't wait on disk;
+# pytest_sessionfinish waits for every write before the session ends. The
+# executor is created on first use and dropped at session end, so a second
+# session in the same process (pytest.main, pytester) gets a fresh one
+_writer: ThreadPoolExecutor | None = None
+_pending_writes: list[tuple[Future[None], str]] = []
+
+# Pages larger than this many characters are saved gzipped (.html.gz)
+_GZIP_THRESHOLD = 512_000
 
 
 def pytest_runtest_makereport(item, call):
     """Hook to execute after each test phase."""
-    if call.when == "call":
-        if call.excinfo is not None:
-            print(f"DEBUG: Test failed: {item.name}, capturing snapshot...")
-            _capture_snapshot(item)
+    # Runs for every phase of every test, so bail out early unless it failed
+    if call.excinfo is None or call.when != "call":
+        return
+    
+    print(f"DEBUG: Test failed: {item.name}, capturing snapshot...")
+    _capture_snapshot(item)
+
+
+def pytest_sessionfinish(session: "pytest.Session", exitstatus: int) -> None:
+    """Wait for queued snapshot writes so they're on disk when pytest exits."""
+    global _writer
+    
+    wait([future for future, _ in _pending_writes])
+    for future, filename in _pending_writes:
+        if error := future.exception():
+            warnings.warn(f"test-warden could not save snapshot {filename}: {error}")
+    _pending_writes.clear()
+    
+    if _writer is not None:
+        _writer.shutdown()
+        _writer = None
 
 
 def _capture_snapshot(item):
     """Capture snapshot from the test driver."""
+    # Only needed once a test has failed
+    from datetime import datetime
+    from pathlib import Path
+    
     # Create failures directory
     # Try to put it relative to the test file, or in cwd
     try:
@@ -63,9 +98,31 @@ def _capture_snapshot(item):
             pass
             
         if content:
-            try:
-                filename.write_text(content, encoding="utf-8")
-                # Attach path to the item for reporting if needed
-                item.user_properties.append(("snapshot_path", str(filename)))
-            except Exception:
-                pass
+            if len(content) > _GZIP_THRESHOLD:
+                filename = filename.with_suffix(".html.gz")
+            # A failed write is reported as a warning at session end
+            future = _snapshot_writer().submit(_write_snapshot, filename, content)
+            _pending_writes.append((future, str(filename)))
+            # Attach path to the item for reporting if needed
+            item.user_properties.append(("snapshot_path", str(filename)))
+
+
+def _snapshot_writer() -> ThreadPoolExecutor:
+    """Get the background snapshot writer, starting it on first use."""
+    global _writer
+    if _writer is None:
+        _writer = ThreadPoolExecutor(max_workers=2, thread_name_prefix="test-warden-snapshot")
+    return _writer
+
+
+def _write_snapshot(filename: "Path", content: str) -> None:
+    """Write a snapshot, gzipped if the name ends in .gz."""
+    if filename.suffix != ".gz":
+        filename.write_text(content, encoding="utf-8")
+        return
+    
+    import gzip
+    
+    # Level 1 is several times faster than the default and still shrinks HTML well
+    with gzip.open(filename, "wt", encoding="utf-8", compresslevel=1) as f:
+        f.write(content)
@@ -1,13 +1,13 @@
 """Langfuse integration for LLM observability."""
 
 from contextlib import contextmanager
-from functools import wraps
-from typing import Any, Callable
-
-from langfuse import Langfuse
+from typing import TYPE_CHECKING, Any
 
 from .config import Config
 
+if TYPE_CHECKING:
+    from langfuse import Langfuse
+
 
 class TracingClient:
     """Langfuse tracing client for observability."""
@@ -15,12 +15,21 @@ class TracingClient:
     def __init__(self, config: Config):
         self.config = config
         self.enabled = config.langfuse.enabled
-        self._client: Langfuse | None = None
+        self._client: "Langfuse | None" = None
+        # Whether events were logged since the last flush
+        self._pending = False
         
         if self.enabled:
+            # The Langfuse SDK is slow to import, so only load it when tracing is on
+            from langfuse import Langfuse
+            
+            # The SDK queues events and sends them from a background thread;
+            # send fewer, larger batches than its defaults
             self._client = Langfuse(
                 public_key=config.langfuse.public_key,
                 secret_key=config.langfuse.secret_key,
+                flush_at=50,
+                flush_interval=2.0,
             )
     
     @contextmanager
@@ -30,6 +39,7 @@ class TracingClient:
             yield None
             return
         
+        self._pending = True
         trace = self._client.trace(
             name=name,
             metadata=metadata or {},
@@ -53,6 +63,7 @@ class TracingClient:
         if not self.enabled or not self._client:
             return
         
+        self._pending = True
         self._client.generation(
             trace_id=trace_id,
             name=name,
@@ -74,6 +85,7 @@ class TracingClient:
         if not self.enabled or not self._client:
             return
         
+        self._pending = True
         self._client.span(
             trace_id=trace_id,
             name=name,
@@ -82,51 +94,12 @@ class TracingClient:
         )
     
     def flush(self) -> None:
-        """Flush pending events to Langfuse."""
-        if self._client:
+        """Flush pending events to Langfuse, skipping the blocking call if there are none."""
+        if self._client and self._pending:
+            self._pending = False
             self._client.flush()
 
 
-def trace_gemini_call(name: str):
-    """Decorator to trace Gemini API calls."""
-    def decorator(func: Callable):
-        @wraps(func)
-        async def wrapper(self, *args, **kwargs):
-            # Get tracing client from self if available
-            tracing = getattr(self, '_tracing', None)
-            
-            if not tracing or not tracing.enabled:
-                return await func(self, *args, **kwargs)
-            
-            # Create trace
-            with tracing.trace(name) as trace:
-                trace_id = trace.id if trace else None
-                
-                # Capture input
-                input_data = {
-                    "args": str(args)[:500],
-                    "kwargs": {k: str(v)[:200] for k, v in kwargs.items()},
-                }
-                
-                # Call function
-                result = await func(self, *args, **kwargs)
-                
-                # Log generation
-                tracing.generation(
-                    trace_id=trace_id,
-                    name=name,
-                    model=self.config.gemini.model,
-                    input_data=input_data,
-                    output_data=str(result)[:1000],
-                    metadata={"function": func.__name__},
-                )
-                
-                return result
-        
-        return wrapper
-    return decorator
-
-
 # Global tracing instance (initialized by CLI)
 _tracing: TracingClient | None = None
 
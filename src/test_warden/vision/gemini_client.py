@@ -1,14 +1,89 @@
 """Gemini client for Vision and text analysis with Langfuse tracing."""
 
-import base64
+import asyncio
+import io
+from contextlib import nullcontext
+from functools import lru_cache
 from pathlib import Path
 
 import google.generativeai as genai
-from tenacity import retry, stop_after_attempt, wait_exponential
+from google.api_core import exceptions as google_exceptions
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
 
 from ..config import Config
 from ..tracing import TracingClient, get_tracing
 
+# Metadata attached to every logged generation
+_GENERATION_METADATA = {"provider": "gemini"}
+
+# Stand-in trace context when tracing is off; nullcontext can be reused
+_NO_TRACE = nullcontext(None)
+
+# Retry Gemini calls only on errors that can clear up by themselves; bad
+# requests, auth failures and missing screenshots fail straight away
+_gemini_retry = retry(
+    stop=stop_after_attempt(3),
+    wait=wait_exponential(multiplier=1, min=1, max=10),
+    retry=retry_if_exception_type((
+        google_exceptions.TooManyRequests,
+        google_exceptions.InternalServerError,
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.DeadlineExceeded,
+        asyncio.TimeoutError,
+    )),
+)
+
+
+def _image_part(path: Path) -> dict:
+    """
+    Build an inline image part for a Gemini request from a PNG screenshot.
+    
+    The SDK takes raw bytes; a base64 string would only be decoded back to
+    bytes before sending, after holding both copies in memory. Parts are
+    cached while the file is unchanged, so retries and a baseline compared
+    against many screenshots read it once; treat the result as read-only.
+    """
+    stat = path.stat()
+    return _load_image_part(str(path), stat.st_mtime_ns, stat.st_size)
+
+
+# Screenshots can be a few MB each, so only the most recent are kept
+@lru_cache(maxsize=32)
+def _load_image_part(path: str, mtime_ns: int, size: int) -> dict:
+    """Read an image for _image_part; mtime_ns and size key the cache."""
+    mime_type, data = _compress_png(Path(path).read_bytes())
+    return {
+        "mime_type": mime_type,
+        "data": data,
+    }
+
+
+def _compress_png(data: bytes) -> tuple[str, bytes]:
+    """
+    Re-encode a PNG as lossless WebP when Pillow is installed and it's smaller.
+    
+    Screenshots are mostly flat UI colours, which lossless WebP usually packs
+    well below PNG, so less has to be uploaded. Pixels are unchanged, so
+    visual comparisons see exactly the same image.
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        return "image/png", data
+    
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            buffer = io.BytesIO()
+            image.save(buffer, "WEBP", lossless=True)
+    except (KeyError, OSError, ValueError):
+        # Not decodable, or Pillow was built without WebP support
+        return "image/png", data
+    
+    webp = buffer.getvalue()
+    if len(webp) < len(data):
+        return "image/webp", webp
+    return "image/png", data
+
 
 class GeminiClient:
     """Client for Gemini AI API with Vision support and Langfuse tracing."""
@@ -17,34 +92,43 @@ class GeminiClient:
         self.config = config
         self.model_name = config.gemini.model
         self._tracing = tracing or get_tracing()
+        # Resolved once, so calls skip the tracing client entirely when it's off
+        self._tracing_on = bool(self._tracing and self._tracing.enabled)
+        # Caps this client's in-flight Gemini requests; see _request_slots()
+        self._max_requests = max(1, config.gemini.max_concurrency)
+        self._requests: tuple[asyncio.AbstractEventLoop, asyncio.Semaphore] | None = None
         
         # Configure the API
         genai.configure()  # Uses GOOGLE_API_KEY env var
         
         self.model = genai.GenerativeModel(self.model_name)
     
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=1, max=10),
-    )
+    def _request_slots(self) -> asyncio.Semaphore:
+        """
+        Get the request semaphore for the running event loop.
+        
+        A semaphore binds to the first loop that waits on it, and the CLI
+        runs separate event loops, so each loop gets its own.
+        """
+        loop = asyncio.get_running_loop()
+        if self._requests is None or self._requests[0] is not loop:
+            self._requests = (loop, asyncio.Semaphore(self._max_requests))
+        return self._requests[1]
+    
+    @_gemini_retry
     async def analyze_screenshot(
         self,
         screenshot_path: Path,
         prompt: str,
     ) -> str:
         """Analyze a screenshot using Gemini Vision."""
-        # Read and encode image
-        with open(screenshot_path, "rb") as f:
-            image_data = base64.b64encode(f.read()).decode("utf-8")
-        
-        image_part = {
-            "mime_type": "image/png",
-            "data": image_data,
-        }
+        # Read off the event loop so other requests keep going meanwhile
+        image_part = await asyncio.to_thread(_image_part, screenshot_path)
         
         # Trace the call
         with self._trace("analyze_screenshot") as trace_id:
-            response = await self.model.generate_content_async([prompt, image_part])
+            async with self._request_slots():
+                response = await self.model.generate_content_async([prompt, image_part])
             result = response.text
             
             self._log_generation(
@@ -56,10 +140,7 @@ class GeminiClient:
             
             return result
     
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=1, max=10),
-    )
+    @_gemini_retry
     async def compare_screenshots(
         self,
         baseline_path: Path,
@@ -67,24 +148,20 @@ class GeminiClient:
         prompt: str,
     ) -> str:
         """Compare two screenshots using Gemini Vision."""
-        def load_image(path: Path) -> dict:
-            with open(path, "rb") as f:
-                return {
-                    "mime_type": "image/png",
-                    "data": base64.b64encode(f.read()).decode("utf-8"),
-                }
-        
-        baseline_part = load_image(baseline_path)
-        current_part = load_image(current_path)
+        baseline_part, current_part = await asyncio.gather(
+            asyncio.to_thread(_image_part, baseline_path),
+            asyncio.to_thread(_image_part, current_path),
+        )
         
         with self._trace("compare_screenshots") as trace_id:
-            response = await self.model.generate_content_async([
-                prompt,
-                "Baseline screenshot:",
-                baseline_part,
-                "Current screenshot:",
-                current_part,
-            ])
+            async with self._request_slots():
+                response = await self.model.generate_content_async([
+                    prompt,
+                    "Baseline screenshot:",
+                    baseline_part,
+                    "Current screenshot:",
+                    current_part,
+                ])
             result = response.text
             
             self._log_generation(
@@ -100,10 +177,7 @@ class GeminiClient:
             
             return result
     
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=1, max=10),
-    )
+    @_gemini_retry
     async def classify_failure(
         self,
         failure_description: str,
@@ -125,7 +199,8 @@ Respond in JSON format:
 }}
 """
         with self._trace("classify_failure") as trace_id:
-            response = await self.model.generate_content_async(prompt)
+            async with self._request_slots():
+                response = await self.model.generate_content_async(prompt)
             result = response.text
             
             self._log_generation(
@@ -139,12 +214,11 @@ Respond in JSON format:
     
     def _trace(self, name: str):
         """Create a trace context."""
-        if self._tracing:
+        if self._tracing_on:
             return self._tracing.trace(f"gemini.{name}")
         
         # Return a no-op context manager
-        from contextlib import nullcontext
-        return nullcontext(None)
+        return _NO_TRACE
     
     def _log_generation(
         self,
@@ -154,12 +228,12 @@ Respond in JSON format:
         output_data: str,
     ) -> None:
         """Log a generation to Langfuse."""
-        if self._tracing:
+        if self._tracing_on:
             self._tracing.generation(
                 trace_id=trace_id,
                 name=name,
                 model=self.model_name,
                 input_data=input_data,
                 output_data=output_data,
-                metadata={"provider": "gemini"},
+                metadata=_GENERATION_METADATA,
             )
@@ -7,8 +7,8 @@ from unittest.mock import MagicMock
 class MockPage:
     """Mock Playwright Page for demonstration."""
     
-    def __init__(self):
-        self.content_html = """
+    # Shared by every test's page; the page never changes
+    content_html = """
         <html>
         <body>
             <div data-testid="cart-summary">
@@ -21,15 +21,15 @@ class MockPage:
         </html>
         """
     
+    failing_selectors = frozenset({
+        "#cart-icon",           # Was changed to data-testid="cart-summary"
+        ".checkout-btn",        # Was changed to data-testid="checkout-button"
+        "#item-count",          # Was changed to data-testid="cart-count"
+    })
+    
     def locator(self, selector):
         """Simulate locator - fails for old selectors."""
-        failing_selectors = [
-            "#cart-icon",           # Was changed to data-testid="cart-summary"
-            ".checkout-btn",        # Was changed to data-testid="checkout-button"
-            "#item-count",          # Was changed to data-testid="cart-count"
-        ]
-        
-        if selector in failing_selectors:
+        if selector in self.failing_selectors:
             raise Exception(f"TimeoutError: Locator '{selector}' not found")
         
         return MagicMock()
@@ -7,8 +7,8 @@ from unittest.mock import MagicMock
 class MockDriver:
     """Mock Selenium WebDriver for demonstration."""
     
-    def __init__(self):
-        self.page_source = """
+    # Shared by every test's driver; the page never changes
+    page_source = """
         <html>
         <body>
             <form id="login-form">
@@ -21,17 +21,17 @@ class MockDriver:
         </html>
         """
     
+    # These OLD selectors will fail (simulating a UI refactor)
+    failing_selectors = frozenset({
+        "old-submit-btn",      # Was renamed to submit-button
+        "login-button",        # Was renamed to submit-button
+        "email-field",         # Was renamed to email-input
+        "password-field",      # Was renamed to password-input
+    })
+    
     def find_element(self, by, value):
         """Simulate element finding - fails for old selectors."""
-        # These OLD selectors will fail (simulating a UI refactor)
-        failing_selectors = [
-            "old-submit-btn",      # Was renamed to submit-button
-            "login-button",        # Was renamed to submit-button
-            "email-field",         # Was renamed to email-input
-            "password-field",      # Was renamed to password-input
-        ]
-        
-        if value in failing_selectors:
+        if value in self.failing_selectors:
             raise Exception(f"NoSuchElementException: Unable to locate element: {value}")
         
         return MagicMock()